@@ -0,0 +1,90 @@
+"""
+Benchmark BTree against AVLTree.
+
+Times buildFromList, random insert, search, irange and delete for each size and prints one
+row per (size, operation). Run from the repository root:
+
+    python benchmarks/btree_vs_avl.py
+    python benchmarks/btree_vs_avl.py --sizes 1e5 1e6 1e7 --order 128
+
+1e7 keys needs several GB of memory for the AVLTree alone.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pytrees import AVLTree, BTree
+
+
+def timeit(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def bench(n, order, ops, seed):
+    rnd = random.Random(seed)
+    keys = list(range(0, 2 * n, 2))
+    new_keys = [rnd.randrange(2 * n) | 1 for _ in range(ops)]
+    probes = [rnd.randrange(2 * n) for _ in range(ops)]
+    victims = rnd.sample(keys, ops)
+    starts = [rnd.randrange(2 * n) for _ in range(ops // 100)]
+    rows = []
+    trees = {}
+    for name, build in (("AVLTree", lambda: AVLTree.buildFromList(keys, shuffle = False)),
+                        ("BTree", lambda: BTree.buildFromList(keys, shuffle = False, order = order))):
+        res = {}
+        res["buildFromList"] = timeit(lambda: trees.__setitem__(name, build()))
+        T = trees[name]
+        insert, search, delete, irange = T.insert, T.search, T.delete, T.irange
+
+        def run_insert():
+            for k in new_keys:
+                insert(k)
+
+        def run_search():
+            for k in probes:
+                search(k)
+
+        def run_irange():
+            # 100 keys per scan
+            for k in starts:
+                for _ in irange(k, k + 200):
+                    pass
+
+        def run_delete():
+            for k in victims:
+                delete(k)
+
+        res["insert"] = timeit(run_insert)
+        res["search"] = timeit(run_search)
+        res["irange"] = timeit(run_irange)
+        res["delete"] = timeit(run_delete)
+        rows.append((name, res))
+        del trees[name], T
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", nargs = "+", type = float, default = [1e5, 1e6])
+    parser.add_argument("--order", type = int, default = 128)
+    parser.add_argument("--ops", type = int, default = 100000, help = "operations timed per row")
+    parser.add_argument("--seed", type = int, default = 0)
+    args = parser.parse_args()
+    print("%10s %-14s %12s %12s %8s" % ("n", "operation", "AVLTree (s)", "BTree (s)", "speedup"))
+    for size in args.sizes:
+        n = int(size)
+        ops = min(args.ops, n)
+        (_, avl), (_, btree) = bench(n, args.order, ops, args.seed)
+        for op in avl:
+            print("%10d %-14s %12.3f %12.3f %7.1fx" % (n, op, avl[op], btree[op], avl[op] / btree[op]))
+
+
+if __name__ == "__main__":
+    main()
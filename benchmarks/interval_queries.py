@@ -0,0 +1,94 @@
+"""
+Benchmark IntervalTree inserts and overlap queries.
+
+Builds a tree of n random intervals, then times queryOverlap, queryAllOverlaps, queryAllOverlapsBatch,
+queryAllOverlapsParallel and search.
+With numpy installed the same queries also run against a StaticIntervalIndex, one by one and as one batch.
+Prints operations per second for each. Run from the repository root:
+
+    python benchmarks/interval_queries.py --n 1e6
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pytrees import IntervalTree
+from pytrees.StaticIntervalIndex import np, StaticIntervalIndex
+
+
+def randomIntervals(rnd, count, span, width):
+    res = []
+    for _ in range(count):
+        start = rnd.randrange(span)
+        res.append((start, start + rnd.randrange(width)))
+    return res
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("--n", type = float, default = 1e6, help = "intervals in the tree")
+    parser.add_argument("--span", type = int, default = 10**9)
+    parser.add_argument("--width", type = int, default = 1000, help = "max interval length")
+    parser.add_argument("--queries", type = int, default = 100000)
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--workers", type = int, default = os.cpu_count(), help = "processes for queryAllOverlapsParallel")
+    args = parser.parse_args()
+    rnd = random.Random(args.seed)
+    n = int(args.n)
+    intervals = randomIntervals(rnd, n, args.span, args.width)
+    queries = randomIntervals(rnd, args.queries, args.span, args.width * 100)
+    rows = []
+
+    T = IntervalTree()
+    insert = T.insert
+    start = time.perf_counter()
+    for interval in intervals:
+        insert(interval)
+    rows.append(("insert", n, time.perf_counter() - start))
+
+    for name, func in (("queryOverlap", T.queryOverlap), ("queryAllOverlaps", T.queryAllOverlaps)):
+        start = time.perf_counter()
+        for q in queries:
+            func(q)
+        rows.append((name, len(queries), time.perf_counter() - start))
+
+    start = time.perf_counter()
+    T.queryAllOverlapsBatch(queries)
+    rows.append(("queryAllOverlapsBatch", len(queries), time.perf_counter() - start))
+
+    start = time.perf_counter()
+    T.queryAllOverlapsParallel(queries, workers = args.workers)
+    rows.append(("parallel, %d workers" % args.workers, len(queries), time.perf_counter() - start))
+
+    probes = rnd.sample(intervals, len(queries))
+    search = T.search
+    start = time.perf_counter()
+    for q in probes:
+        search(q)
+    rows.append(("search", len(queries), time.perf_counter() - start))
+
+    if np is not None:
+        start = time.perf_counter()
+        index = StaticIntervalIndex(intervals)
+        rows.append(("static build", n, time.perf_counter() - start))
+        queryAll = index.queryAllOverlaps
+        start = time.perf_counter()
+        for q in queries:
+            queryAll(q)
+        rows.append(("static query", len(queries), time.perf_counter() - start))
+        start = time.perf_counter()
+        index.queryAllOverlapsBatch(queries)
+        rows.append(("static batch", len(queries), time.perf_counter() - start))
+
+    print("%-22s %10s %10s %14s" % ("operation", "count", "time (s)", "ops per second"))
+    for name, count, elapsed in rows:
+        print("%-22s %10d %10.3f %14.0f" % (name, count, elapsed, count / elapsed))
+
+
+if __name__ == "__main__":
+    main()
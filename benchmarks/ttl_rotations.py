@@ -0,0 +1,51 @@
+"""
+Benchmark AVLTree against RedBlackTree on a delete heavy workload.
+
+A TTL cache keeps a sliding window of expiry times: every step inserts a new expiry and deletes
+the oldest one, so deletes are exactly as frequent as inserts. Prints time and rotations per step.
+Run from the repository root:
+
+    python benchmarks/ttl_rotations.py --window 1e5 --steps 1e6
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pytrees import AVLTree, RedBlackTree
+
+
+def bench(cls, window, steps, seed):
+    rnd = random.Random(seed)
+    # expiry = now + ttl, with jittered ttl the inserts land all over the window
+    expiries = [i + rnd.random() * window for i in range(window + steps)]
+    T = cls.buildFromList(sorted(expiries[:window]))
+    insert, delete, minimum = T.insert, T.delete, T.min
+    start = time.perf_counter()
+    for i in range(window, window + steps):
+        insert(expiries[i])
+        delete(minimum())
+    elapsed = time.perf_counter() - start
+    assert T.countNodes() == window
+    return elapsed, T.rotation_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("--window", type = float, default = 1e5)
+    parser.add_argument("--steps", type = float, default = 2e5)
+    parser.add_argument("--seed", type = int, default = 0)
+    args = parser.parse_args()
+    window, steps = int(args.window), int(args.steps)
+    print("%-14s %10s %16s %18s" % ("tree", "time (s)", "us per step", "rotations per step"))
+    for cls in (AVLTree, RedBlackTree):
+        elapsed, rotations = bench(cls, window, steps, args.seed)
+        print("%-14s %10.3f %16.2f %18.3f" % (cls.__name__, elapsed, elapsed / steps * 1e6, rotations / steps))
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,45 @@ API:
 - postOrder(self)
 - countNodes(self)
 - buildFromList(cls, l)
+- rank(self, key)
+- select(self, k)
+- countRange(self, lo, hi)
+- count(self, key)
+- setAggregate(self, combine, identity, measure)
+- aggregate(self, lo, hi)
+- irange(self, lo, hi, reverse)
+- __iter__(self)
+- min(self) / max(self)
+- floor(self, key) / ceiling(self, key)
+- predecessor(self, key) / successor(self, key)
+- cursor(self, key, reverse)  --> AVLCursor with next() / prev()
+
+Map mode, the payload is stored in the node next to its key:
+
+- __setitem__(self, key, value)
+- __getitem__(self, key)
+- __delitem__(self, key)
+- get(self, key, default)
+- pop(self, key, default)
+- keys(self) / values(self) / items(self)
+- AVLTree(key=func): insert(item) stores item under key func(item)
+
+Multiset mode, AVLTree(multiset=True): equal vals share one node with a count.
+delete(key) drops one copy, size, rank, select and traversals count every copy.
+
+Batch update:
+
+- insertMany(self, l)
+- deleteMany(self, l)
+
+Join based, other is consumed:
+
+- join(self, other)
+- split(self, key)
+- deleteRange(self, lo, hi)
+- union(self, other)
+- intersection(self, other)
+- difference(self, other)
 
 Author: Yi Zhou
 Date: May 19, 2018 
@@ -25,17 +64,26 @@ Reference: https://en.wikipedia.org/wiki/AVL_tree
 Reference: https://github.com/pgrafov/python-avl-tree/blob/master/pyavltree.py
 """
 
+from bisect import bisect_left, bisect_right
 from collections import deque
-import random
+from itertools import islice
+import operator
 
 
 class AVLNode:
-    def __init__(self, val):
+    # no per-node __dict__, see README for memory per node
+    __slots__ = ("val", "payload", "count", "parent", "left", "right", "height", "size", "agg")
+
+    def __init__(self, val, payload = None):
         self.val = val
+        self.payload = payload # value stored alongside the key in map mode
         self.parent = None
         self.left = None
         self.right = None 
         self.height = 0
+        self.count = 1 # copies of val, only above 1 in multiset mode
+        self.size = 1 # Augmented DataStructure: number of vals (counting copies) in the subtree rooted at this node
+        self.agg = None # Augmented DataStructure: fold of the registered aggregate over the subtree rooted at this node
 
     def isLeaf(self):
         return (self.height == 0)
@@ -56,20 +104,143 @@ class AVLNode:
     def __str__(self):
         return "AVLNode("+ str(self.val)+ ", Height: %d )" % self.height
 
+class AVLCursor:
+    """
+    A position in an AVLTree. next() and prev() step along the parent pointers
+    in amortized O(1), so a sequential scan never descends from the root again.
+    Any insert or delete on the AVLTree invalidates the cursor.
+    """
+    __slots__ = ("tree", "node")
+
+    def __init__(self, tree, node):
+        self.tree = tree
+        self.node = node
+
+    def valid(self):
+        """
+        return False once the cursor moved past either end.
+        """
+        return self.node is not None
+
+    @property
+    def val(self):
+        return self.node.val if self.node else None
+
+    @property
+    def payload(self):
+        return self.node.payload if self.node else None
+
+    def next(self):
+        """
+        move to the next val and return it, None at the end.
+        """
+        if self.node:
+            self.node = self.tree._nextNode(self.node)
+        return self.val
+
+    def prev(self):
+        """
+        move to the previous val and return it, None at the beginning.
+        """
+        if self.node:
+            self.node = self.tree._prevNode(self.node)
+        return self.val
+
+    def __str__(self):
+        return "AVLCursor(" + str(self.val) + ")"
+
 class AVLTree:
-    def __init__(self):
+    def __init__(self, key = None, multiset = False):
+        """
+        key: optional function. insert(item) then stores item as the payload under key(item).
+        multiset: store equal vals as one node with a count instead of one node per copy.
+        """
         self.root = None
         self.rebalance_count = 0
+        self.rotation_count = 0 # single rotations, a double rotation counts 2
         self.nodes_count = 0
+        self.key = key
+        self.multiset = multiset
+        self.combine = None
+        self.identity = None
+        self.measure = None
     
-    def setRoot(self, val):
+    def setRoot(self, val, payload = None):
         """
         Set the root value
         """
-        self.root = AVLNode(val)
+        self.root = AVLNode(val, payload)
     
     def countNodes(self):
         return self.nodes_count
+
+    def __len__(self):
+        return self.nodes_count
+
+    def __contains__(self, key):
+        return self.search(key) is not None
+
+    def __getitem__(self, key):
+        """
+        return the payload stored under key, raise KeyError if not found.
+        """
+        node = self.search(key)
+        if node is None:
+            raise KeyError(key)
+        return node.payload
+
+    def __setitem__(self, key, value):
+        """
+        store value under key. replace the payload if key is already in the AVLTree.
+        """
+        node = self.search(key)
+        if node is None:
+            self._insert(key, value)
+        else:
+            node.payload = value
+            self._fixAggregates(node)
+
+    def __delitem__(self, key):
+        node = self.search(key)
+        if node is None:
+            raise KeyError(key)
+        self._deleteNode(node)
+
+    def get(self, key, default = None):
+        """
+        return the payload stored under key, or default if not found.
+        """
+        node = self.search(key)
+        return default if node is None else node.payload
+
+    def pop(self, key, *default):
+        """
+        remove key and return its payload.
+        if not found, return default when given, else raise KeyError.
+        """
+        node = self.search(key)
+        if node is None:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        payload = node.payload
+        self._deleteNode(node)
+        return payload
+
+    def keys(self):
+        for node in self._iterNodes(None, None, False):
+            yield node.val
+
+    def values(self):
+        for node in self._iterNodes(None, None, False):
+            yield node.payload
+
+    def items(self):
+        """
+        Lazily iterate (key, payload) pairs in sorted order.
+        """
+        for node in self._iterNodes(None, None, False):
+            yield (node.val, node.payload)
     
     def getDepth(self):
         """
@@ -97,50 +268,63 @@ class AVLTree:
     def insert(self, val):
         """
         insert a val into AVLTree
+        with a key function, val is stored as the payload under key(val).
         """
+        if self.key is None:
+            self._insert(val, None)
+        else:
+            self._insert(self.key(val), val)
+
+    def _insert(self, val, payload):
+        """
+        insert val with its payload, return the new AVLNode.
+        in multiset mode an existing node of val is counted up instead.
+        """
+        if self.multiset:
+            node = self.search(val)
+            if node is not None:
+                self._addCount(node, 1)
+                return node
         if self.root is None:
-            self.setRoot(val)
+            self.setRoot(val, payload)
+            node = self.root
+            self._fixAggregates(node)
         else:
-            self._insertNode(self.root, val)
+            node = self._insertNode(self.root, val, payload)
         self.nodes_count += 1
+        return node
     
-    def _insertNode(self, currentNode, val):
+    def _insertNode(self, currentNode, val, payload = None):
         """
         Helper function to insert a value into AVLTree.
+        walk down from currentNode in a loop, equal keys go right.
+        return the new AVLNode.
         """
-        node_to_rebalance = None
-        if currentNode.val > val:
-            if(currentNode.left):
-                self._insertNode(currentNode.left, val)
+        while True:
+            currentNode.size += 1
+            if currentNode.val > val:
+                if currentNode.left is None:
+                    child_node = AVLNode(val, payload)
+                    currentNode.left = child_node
+                    break
+                currentNode = currentNode.left
             else:
-                child_node = AVLNode(val)
-                currentNode.left = child_node
-                child_node.parent = currentNode
-                if currentNode.height == 0:
-                    self._recomputeHeights(currentNode)
-                    node = currentNode
-                    while node:
-                        if node.balanceFactor() in [-2 , 2]:
-                            node_to_rebalance = node
-                            break #we need the one that is furthest from the root
-                        node = node.parent
-        else:
-            if(currentNode.right):
-                self._insertNode(currentNode.right, val)
-            else:
-                child_node = AVLNode(val)
-                currentNode.right = child_node
-                child_node.parent = currentNode
-                if currentNode.height == 0:
-                    self._recomputeHeights(currentNode)
-                    node = currentNode
-                    while node:
-                        if node.balanceFactor() in [-2 , 2]:
-                            node_to_rebalance = node
-                            break #we need the one that is furthest from the root
-                        node = node.parent
-        if node_to_rebalance:
-            self._rebalance(node_to_rebalance)
+                if currentNode.right is None:
+                    child_node = AVLNode(val, payload)
+                    currentNode.right = child_node
+                    break
+                currentNode = currentNode.right
+        child_node.parent = currentNode
+        self._fixAggregates(child_node)
+        if currentNode.height == 0:
+            self._recomputeHeights(currentNode)
+            node = currentNode
+            while node:
+                if node.balanceFactor() in [-2 , 2]:
+                    self._rebalance(node) #we need the one that is furthest from the root
+                    break
+                node = node.parent
+        return child_node
 
     def _rebalance(self, node_to_rebalance):
         A = node_to_rebalance 
@@ -183,6 +367,9 @@ class AVLTree:
                    B.parent = F 
                 self._recomputeHeights(A) 
                 self._recomputeHeights(B.parent)
+                self._recomputeSize(A)
+                self._recomputeSize(B)
+                self.rotation_count += 1
             else:
                 """Rebalance, case RLC 
                 [Original]:                   
@@ -225,6 +412,10 @@ class AVLTree:
                     C.parent = F
                 self._recomputeHeights(A)
                 self._recomputeHeights(B)
+                self._recomputeSize(A)
+                self._recomputeSize(B)
+                self._recomputeSize(C)
+                self.rotation_count += 2
         else:
             assert(node_to_rebalance.balanceFactor() == +2)
             if node_to_rebalance.left.balanceFactor() >= 0:
@@ -264,6 +455,9 @@ class AVLTree:
                    B.parent = F 
                 self._recomputeHeights(A) 
                 self._recomputeHeights(B.parent)
+                self._recomputeSize(A)
+                self._recomputeSize(B)
+                self.rotation_count += 1
             else:
                 """Rebalance, case LRC 
                 [Original]:                   
@@ -307,8 +501,69 @@ class AVLTree:
                    C.parent = F
                 self._recomputeHeights(A)
                 self._recomputeHeights(B)
+                self._recomputeSize(A)
+                self._recomputeSize(B)
+                self._recomputeSize(C)
+                self.rotation_count += 2
         self.rebalance_count += 1
 
+    def _recomputeSize(self, node):
+        """
+        update the size (and the aggregate, if one is registered) of an AVLNode from its children.
+        """
+        node.size = (node.left.size if node.left else 0) + (node.right.size if node.right else 0) + node.count
+        if self.combine is not None:
+            self._recomputeAgg(node)
+
+    def _recomputeAgg(self, node):
+        """
+        update the aggregate of an AVLNode from its children, keeping the in-order of the fold.
+        """
+        combine = self.combine
+        agg = self._measureNode(node)
+        if node.left:
+            agg = combine(node.left.agg, agg)
+        if node.right:
+            agg = combine(agg, node.right.agg)
+        node.agg = agg
+
+    def _measureNode(self, node):
+        """
+        return the aggregate of node alone, without its subtrees.
+        """
+        agg = self.measure(node.val, node.payload)
+        if node.count > 1:
+            # multiset mode, fold count copies by doubling
+            combine = self.combine
+            one, agg, n = agg, self.identity, node.count
+            while n:
+                if n & 1:
+                    agg = combine(agg, one)
+                one = combine(one, one)
+                n >>= 1
+        return agg
+
+    def _fixAggregates(self, node):
+        """
+        recompute the aggregates from node up to the root.
+        """
+        if self.combine is None:
+            return
+        while node:
+            self._recomputeAgg(node)
+            node = node.parent
+
+    def _addCount(self, node, delta):
+        """
+        change the count of node by delta and fix the sizes up to the root.
+        """
+        node.count += delta
+        self.nodes_count += delta
+        self._fixAggregates(node)
+        while node:
+            node.size += delta
+            node = node.parent
+
     def _recomputeHeights(self, start_from_node):
         changed = True
         node = start_from_node
@@ -329,14 +584,241 @@ class AVLTree:
         """
         Helper function to search a key in AVLTree.
         """
-        if currentNode is None:
-            return None
-        elif currentNode.val == key:
-            return currentNode
-        elif currentNode.val > key:
-            return self._dfsSearch(currentNode.left, key)
+        node = currentNode
+        while node is not None:
+            if node.val == key:
+                return node
+            node = node.left if node.val > key else node.right
+        return None
+
+    def min(self):
+        """
+        return the smallest val, None if the AVLTree is empty.
+        """
+        return self._findSmallest(self.root).val if self.root else None
+
+    def max(self):
+        """
+        return the biggest val, None if the AVLTree is empty.
+        """
+        return self._findBiggest(self.root).val if self.root else None
+
+    def floor(self, key):
+        """
+        return the biggest val <= key, None if not found. O(logN)
+        """
+        node = self._floorNode(key, True)
+        return node.val if node else None
+
+    def ceiling(self, key):
+        """
+        return the smallest val >= key, None if not found. O(logN)
+        """
+        node = self._ceilingNode(key, True)
+        return node.val if node else None
+
+    def predecessor(self, key):
+        """
+        return the biggest val < key, None if not found. O(logN)
+        """
+        node = self._floorNode(key, False)
+        return node.val if node else None
+
+    def successor(self, key):
+        """
+        return the smallest val > key, None if not found. O(logN)
+        """
+        node = self._ceilingNode(key, False)
+        return node.val if node else None
+
+    def _floorNode(self, key, inclusive):
+        res = None
+        node = self.root
+        while node:
+            if node.val < key or (inclusive and node.val == key):
+                res = node
+                node = node.right
+            else:
+                node = node.left
+        return res
+
+    def _ceilingNode(self, key, inclusive):
+        res = None
+        node = self.root
+        while node:
+            if node.val > key or (inclusive and node.val == key):
+                res = node
+                node = node.left
+            else:
+                node = node.right
+        return res
+
+    def _nextNode(self, node):
+        """
+        return the in-order successor of node through parent pointers, amortized O(1).
+        """
+        if node.right:
+            return self._findSmallest(node.right)
+        while node.parent and node is node.parent.right:
+            node = node.parent
+        return node.parent
+
+    def _prevNode(self, node):
+        """
+        return the in-order predecessor of node through parent pointers, amortized O(1).
+        """
+        if node.left:
+            return self._findBiggest(node.left)
+        while node.parent and node is node.parent.left:
+            node = node.parent
+        return node.parent
+
+    def cursor(self, key = None, reverse = False):
+        """
+        return an AVLCursor at the smallest val >= key, or at the biggest val <= key if reverse.
+        key of None starts from the smallest (biggest if reverse) val. O(logN)
+        """
+        if key is None:
+            node = None
+            if self.root:
+                node = self._findBiggest(self.root) if reverse else self._findSmallest(self.root)
+        else:
+            node = self._floorNode(key, True) if reverse else self._ceilingNode(key, True)
+        return AVLCursor(self, node)
+
+    def setAggregate(self, combine, identity, measure = None):
+        """
+        Register an associative aggregate, kept in every node through inserts, deletes and rotations.
+        combine(a, b): associative, need not be commutative.
+        identity: combine(identity, a) == combine(a, identity) == a.
+        measure(key, payload): value of one node, the payload by default.
+        O(N) to compute the aggregate of the existing nodes.
+        """
+        self.combine = combine
+        self.identity = identity
+        self.measure = measure if measure is not None else (lambda key, payload: payload)
+        stack = [self.root] if self.root else []
+        order = []
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            if node.left:
+                stack.append(node.left)
+            if node.right:
+                stack.append(node.right)
+        for node in reversed(order):
+            # children before parents
+            self._recomputeAgg(node)
+
+    def aggregate(self, lo = None, hi = None):
+        """
+        return the fold of the registered aggregate over the keys in the closed range [lo, hi], in key order.
+        lo/hi of None means unbounded. O(logN)
+        """
+        assert self.combine is not None, "no aggregate registered, call setAggregate first"
+        combine = self.combine
+        # find the first node inside the range, every node of the range is in its subtree
+        node = self.root
+        while node:
+            if lo is not None and node.val < lo:
+                node = node.right
+            elif hi is not None and node.val > hi:
+                node = node.left
+            else:
+                break
+        if node is None:
+            return self.identity
+        split = node
+        identity = self.identity
+        # the part of the left subtree >= lo, collected from right to left
+        node = split.left
+        if lo is None:
+            res_left = node.agg if node else identity
+        else:
+            res_left = identity
+            while node:
+                if node.val < lo:
+                    node = node.right
+                else:
+                    right_agg = node.right.agg if node.right else identity
+                    res_left = combine(self._measureNode(node), combine(right_agg, res_left))
+                    node = node.left
+        # the part of the right subtree <= hi, collected from left to right
+        node = split.right
+        if hi is None:
+            res_right = node.agg if node else identity
         else:
-            return self._dfsSearch(currentNode.right, key)
+            res_right = identity
+            while node:
+                if node.val > hi:
+                    node = node.left
+                else:
+                    left_agg = node.left.agg if node.left else identity
+                    res_right = combine(combine(res_right, left_agg), self._measureNode(node))
+                    node = node.right
+        return combine(combine(res_left, self._measureNode(split)), res_right)
+
+    def rank(self, key):
+        """
+        return the number of keys strictly smaller than key. O(logN)
+        """
+        res = 0
+        node = self.root
+        while node:
+            if node.val < key:
+                res += (node.left.size if node.left else 0) + node.count
+                node = node.right
+            else:
+                node = node.left
+        return res
+
+    def _rankInclusive(self, key):
+        """
+        return the number of keys smaller than or equal to key. O(logN)
+        """
+        res = 0
+        node = self.root
+        while node:
+            if node.val <= key:
+                res += (node.left.size if node.left else 0) + node.count
+                node = node.right
+            else:
+                node = node.left
+        return res
+
+    def select(self, k):
+        """
+        return the k-th smallest val, k starts from 0. negative k counts from the biggest. O(logN)
+        raise IndexError if k is out of range.
+        """
+        if k < 0:
+            k += self.nodes_count
+        if not 0 <= k < self.nodes_count:
+            raise IndexError("AVLTree index out of range")
+        node = self.root
+        while True:
+            left_size = node.left.size if node.left else 0
+            if k < left_size:
+                node = node.left
+            elif k < left_size + node.count:
+                return node.val
+            else:
+                k -= left_size + node.count
+                node = node.right
+
+    def count(self, key):
+        """
+        return the number of copies of key. O(logN)
+        """
+        return self.countRange(key, key)
+
+    def countRange(self, lo, hi):
+        """
+        return the number of keys in the closed range [lo, hi]. O(logN)
+        """
+        if hi < lo:
+            return 0
+        return self._rankInclusive(hi) - self.rank(lo)
 
     def delete(self, key):
         """
@@ -346,27 +828,38 @@ class AVLTree:
         node = self.search(key)
         
         if not node is None:
-            self.nodes_count -= 1
-            #     There are three cases:
-            # 
-            #     1) The node is a leaf.  Remove it and return.
-            # 
-            #     2) The node is a branch (has only 1 child). Make the pointer to this node 
-            #        point to the child of this node.
-            # 
-            #     3) The node has two children. Swap items with the successor
-            #        of the node (the smallest item in its right subtree) and
-            #        delete the successor from the right subtree of the node.
-            if node.isLeaf():
-                self._removeLeaf(node)
-            elif (bool(node.left)) ^ (bool(node.right)):  
-                self._removeBranch(node)
+            if node.count > 1:
+                # multiset mode, drop one copy
+                self._addCount(node, -1)
             else:
-                assert (node.left) and (node.right)
-                self._swapWithSuccessorAndRemove(node)
+                self._deleteNode(node)
+
+    def _deleteNode(self, node):
+        """
+        Remove node (with all its copies) from AVLTree and rebalance.
+        """
+        self.nodes_count -= node.count
+        #     There are three cases:
+        # 
+        #     1) The node is a leaf.  Remove it and return.
+        # 
+        #     2) The node is a branch (has only 1 child). Make the pointer to this node 
+        #        point to the child of this node.
+        # 
+        #     3) The node has two children. Swap items with the successor
+        #        of the node (the smallest item in its right subtree) and
+        #        delete the successor from the right subtree of the node.
+        if node.isLeaf():
+            self._removeLeaf(node)
+        elif (bool(node.left)) ^ (bool(node.right)):  
+            self._removeBranch(node)
+        else:
+            assert (node.left) and (node.right)
+            self._swapWithSuccessorAndRemove(node)
 
     def _removeLeaf(self, node):
         parent = node.parent
+        count = node.count
         if (parent):
             if parent.left == node:
                 parent.left = None
@@ -377,6 +870,12 @@ class AVLTree:
         else:
             self.root = None
         del node
+        # fix size due to the deletion
+        node = parent
+        while (node):
+            node.size -= count
+            node = node.parent
+        self._fixAggregates(parent)
         # rebalance
         node = parent
         while (node):
@@ -386,6 +885,7 @@ class AVLTree:
     
     def _removeBranch(self, node):
         parent = node.parent
+        count = node.count
         if (parent):
             if parent.left == node:
                 parent.left = node.right if node.right else node.left
@@ -398,7 +898,16 @@ class AVLTree:
                 assert (node.right)
                 node.right.parent = parent 
             self._recomputeHeights(parent)
+        else:
+            self.root = node.right if node.right else node.left
+            self.root.parent = None
         del node
+        # fix size due to the deletion
+        node = parent
+        while (node):
+            node.size -= count
+            node = node.parent
+        self._fixAggregates(parent)
         # rebalance
         node = parent
         while (node):
@@ -427,10 +936,13 @@ class AVLTree:
         assert (leftChild2 is None)
         rightChild2 = node2.right
         
-        # swap heights
+        # swap heights and sizes
         tmp = node1.height 
         node1.height = node2.height
         node2.height = tmp
+        tmp = node1.size
+        node1.size = node2.size
+        node2.size = tmp
        
         if parent1:
             if parent1.left == node1:
@@ -457,53 +969,553 @@ class AVLTree:
         else:
             node2.right = node1
             node1.parent = node2  
+        # node1 sits at the old place of node2 with its own count
+        delta = node1.count - node2.count
+        node = node1
+        while delta and node is not node2:
+            node.size += delta
+            node = node.parent
+
+    def insertMany(self, l):
+        """
+        insert every val of l, same as calling insert in a loop.
+        the batch is sorted once and pushed down the AVLTree in slices, subtrees no bigger than
+        their slice are rebuilt in one go. O(mlog(n/m + 1)) for a batch of m vals.
+        return the number of inserted vals.
+        """
+        vals, payloads = self._sortBatch(l, self.key)
+        self._resetRoot(self._insertSorted(self.root, vals, payloads, 0, len(vals)))
+        return len(vals)
+
+    def deleteMany(self, l):
+        """
+        delete every node whose key is in l.
+        in multiset mode every copy in l deletes one copy, same as calling delete in a loop.
+        the batch is sorted once and pushed down the AVLTree in slices, joining what is left. O(mlog(n/m + 1))
+        return the number of deleted nodes.
+        """
+        vals, _ = self._sortBatch(l, None)
+        old_count = self.nodes_count
+        self._resetRoot(self._deleteSorted(self.root, vals, 0, len(vals)))
+        return old_count - self.nodes_count
+
+    def join(self, other):
+        """
+        Append every node of other to this AVLTree, other is left empty.
+        every key in other should be bigger than or equal to every key in this AVLTree.
+        in multiset mode a key at the end of both trees stays one node, the counts are added.
+        O(|depth difference|), at most O(logN).
+        """
+        self._matchAggregate(other)
+        other_root = other.root
+        if self.root and other_root:
+            last = self._findBiggest(self.root)
+            first = self._findSmallest(other_root).val
+            assert last.val <= first
+            if self.multiset and last.val == first:
+                equal, other_root = self._split(other_root, first, True)
+                self._addCount(last, equal.size)
+        root = self._join2(self.root, other_root)
+        other._resetRoot(None)
+        self._resetRoot(root)
+
+    def split(self, key):
+        """
+        Move every key >= key into a new AVLTree and return it.
+        this AVLTree keeps the keys < key. O(logN)
+        """
+        left, right = self._split(self.root, key, False)
+        self._resetRoot(left)
+        other = self._emptyCopy()
+        other._resetRoot(right)
+        return other
+
+    def deleteRange(self, lo, hi):
+        """
+        Delete every key in the closed range [lo, hi] by splitting it out.
+        return the number of deleted keys. O(logN)
+        """
+        if hi < lo:
+            return 0
+        left, rest = self._split(self.root, lo, False)
+        mid, right = self._split(rest, hi, True)
+        self._resetRoot(self._join2(left, right))
+        return mid.size if mid else 0
+
+    def union(self, other):
+        """
+        Add the keys of other that are not in this AVLTree, other is left empty.
+        for keys in both trees the node (and payload) of this AVLTree is kept.
+        in multiset mode counts are added, intersection keeps the smaller count and difference subtracts.
+        O(mlog(n/m + 1)) for trees of sizes m <= n.
+        """
+        self._matchAggregate(other)
+        root = self._union(self.root, other.root)
+        other._resetRoot(None)
+        self._resetRoot(root)
+
+    def intersection(self, other):
+        """
+        Keep only the keys that are also in other, other is left empty.
+        O(mlog(n/m + 1)) for trees of sizes m <= n.
+        """
+        self._matchAggregate(other)
+        root = self._intersection(self.root, other.root)
+        other._resetRoot(None)
+        self._resetRoot(root)
+
+    def difference(self, other):
+        """
+        Delete every key that is in other, other is left empty.
+        O(mlog(n/m + 1)) for trees of sizes m <= n.
+        """
+        self._matchAggregate(other)
+        root = self._difference(self.root, other.root)
+        other._resetRoot(None)
+        self._resetRoot(root)
+
+    def _matchAggregate(self, other):
+        """
+        make the nodes of other carry the aggregate of this AVLTree before they are moved over. O(m)
+        """
+        if self.combine is not None and (other.combine, other.identity, other.measure) != (self.combine, self.identity, self.measure):
+            other.setAggregate(self.combine, self.identity, self.measure)
+
+    def _emptyCopy(self):
+        """
+        return an empty AVLTree with the same configuration.
+        """
+        tree = self.__class__(key = self.key, multiset = self.multiset)
+        if self.combine is not None:
+            tree.setAggregate(self.combine, self.identity, self.measure)
+        return tree
+
+    def _resetRoot(self, root):
+        """
+        make root (allowed to be None) the root of this AVLTree.
+        """
+        if root:
+            root.parent = None
+        self.root = root
+        self.nodes_count = root.size if root else 0
+
+    def _link(self, left, node, right):
+        """
+        Helper function, make left and right the children of node. return node.
+        """
+        node.left = left
+        node.right = right
+        if left:
+            left.parent = node
+        if right:
+            right.parent = node
+        node.height = node.maxChildrenHeight() + 1
+        self._recomputeSize(node)
+        return node
+
+    def _detach(self, node):
+        """
+        Helper function, cut node from its children. return the children.
+        """
+        left, right = node.left, node.right
+        if left:
+            left.parent = None
+        if right:
+            right.parent = None
+        return left, right
+
+    def _rotateLeft(self, node):
+        """
+        Helper function for join. return the new subtree root, the caller links it to the parent.
+        """
+        pivot = node.right
+        self._link(node.left, node, pivot.left)
+        self._link(node, pivot, pivot.right)
+        self.rebalance_count += 1
+        self.rotation_count += 1
+        return pivot
+
+    def _rotateRight(self, node):
+        pivot = node.left
+        self._link(pivot.right, node, node.right)
+        self._link(pivot.left, pivot, node)
+        self.rebalance_count += 1
+        self.rotation_count += 1
+        return pivot
+
+    def _join(self, left, node, right):
+        """
+        Join subtrees left and right with node in the middle, keys in left <= node.val <= keys in right.
+        return the root of the joined AVL subtree. O(|left.height - right.height|)
+        Reference: Blelloch, Ferizovic, Sun. Just Join for Parallel Ordered Sets.
+        """
+        hl = left.height if left else -1
+        hr = right.height if right else -1
+        if hl > hr + 1:
+            root = self._joinRight(left, node, right)
+        elif hr > hl + 1:
+            root = self._joinLeft(left, node, right)
+        else:
+            root = self._link(left, node, right)
+        root.parent = None
+        return root
+
+    def _joinRight(self, left, node, right):
+        """
+        Helper function for _join when left is the taller one, walk down the right spine of left.
+        """
+        l, c = left.left, left.right
+        hl = l.height if l else -1
+        if (c.height if c else -1) <= (right.height if right else -1) + 1:
+            t = self._link(c, node, right)
+            if t.height <= hl + 1:
+                return self._link(l, left, t)
+            self._link(l, left, self._rotateRight(t))
+            return self._rotateLeft(left)
+        t = self._joinRight(c, node, right)
+        self._link(l, left, t)
+        if t.height <= hl + 1:
+            return left
+        return self._rotateLeft(left)
+
+    def _joinLeft(self, left, node, right):
+        """
+        Helper function for _join when right is the taller one, walk down the left spine of right.
+        """
+        c, r = right.left, right.right
+        hr = r.height if r else -1
+        if (c.height if c else -1) <= (left.height if left else -1) + 1:
+            t = self._link(left, node, c)
+            if t.height <= hr + 1:
+                return self._link(t, right, r)
+            self._link(self._rotateLeft(t), right, r)
+            return self._rotateRight(right)
+        t = self._joinLeft(left, node, c)
+        self._link(t, right, r)
+        if t.height <= hr + 1:
+            return right
+        return self._rotateRight(right)
+
+    def _join2(self, left, right):
+        """
+        Join subtrees left and right without a middle node.
+        """
+        if left is None:
+            return right
+        if right is None:
+            left.parent = None
+            return left
+        left, last = self._splitLast(left)
+        return self._join(left, last, right)
+
+    def _splitLast(self, node):
+        """
+        Cut the biggest node out of the subtree. return (rest of the subtree, biggest node).
+        """
+        left, right = self._detach(node)
+        if right is None:
+            return left, node
+        rest, last = self._splitLast(right)
+        return self._join(left, node, rest), last
+
+    def _split(self, node, key, inclusive):
+        """
+        Split the subtree rooted at node into (keys < key, keys >= key),
+        or (keys <= key, keys > key) if inclusive. O(logN)
+        """
+        if node is None:
+            return None, None
+        left, right = self._detach(node)
+        if key < node.val or (not inclusive and key == node.val):
+            ll, lr = self._split(left, key, inclusive)
+            return ll, self._join(lr, node, right)
+        rl, rr = self._split(right, key, inclusive)
+        return self._join(left, node, rl), rr
+
+    def _union(self, t1, t2):
+        if t1 is None:
+            return t2
+        if t2 is None:
+            return t1
+        left1, right1 = self._detach(t1)
+        left2, rest = self._split(t2, t1.val, False)
+        equal2, right2 = self._split(rest, t1.val, True) # drop the equal keys of t2
+        if equal2 and self.multiset:
+            t1.count += equal2.size
+        return self._join(self._union(left1, left2), t1, self._union(right1, right2))
+
+    def _insertSorted(self, node, vals, payloads, lo, hi):
+        """
+        Helper function for insertMany, insert sorted vals[lo:hi] into the subtree rooted at node.
+        the batch is cut with bisect on the way down, small subtrees are rebuilt together with their part of the batch.
+        return the new root of the subtree.
+        """
+        if lo >= hi:
+            return node
+        if node is None or node.size <= hi - lo:
+            return self._rebuildWith(node, vals, payloads, lo, hi)
+        left, right = self._detach(node)
+        mid = bisect_left(vals, node.val, lo, hi) # equal keys go right
+        if self.multiset:
+            end = bisect_right(vals, node.val, mid, hi)
+            node.count += end - mid
+            left = self._insertSorted(left, vals, payloads, lo, mid)
+            right = self._insertSorted(right, vals, payloads, end, hi)
+            return self._join(left, node, right)
+        left = self._insertSorted(left, vals, payloads, lo, mid)
+        right = self._insertSorted(right, vals, payloads, mid, hi)
+        return self._join(left, node, right)
+
+    def _rebuildWith(self, node, vals, payloads, lo, hi):
+        """
+        Merge the nodes of the subtree rooted at node with new nodes for vals[lo:hi], return a balanced subtree.
+        """
+        merged = []
+        multiset = self.multiset
+        def add(i):
+            if multiset and merged and merged[-1].val == vals[i]:
+                merged[-1].count += 1
+            else:
+                merged.append(AVLNode(vals[i], payloads[i] if payloads is not None else None))
+        i = lo
+        stack = []
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            while i < hi and vals[i] < node.val:
+                add(i)
+                i += 1
+            merged.append(node)
+            node = node.right
+        while i < hi:
+            add(i)
+            i += 1
+        return self._buildFromNodes(merged, 0, len(merged) - 1, None)
+
+    def _buildFromNodes(self, nodes, lo, hi, parent):
+        """
+        Helper function to relink sorted nodes[lo..hi] into a perfectly balanced subtree.
+        """
+        if lo > hi:
+            return None
+        mid = (lo + hi) // 2
+        node = nodes[mid]
+        node.parent = parent
+        self._link(self._buildFromNodes(nodes, lo, mid - 1, node), node, self._buildFromNodes(nodes, mid + 1, hi, node))
+        return node
+
+    def _deleteSorted(self, node, vals, lo, hi):
+        """
+        Helper function for deleteMany, delete every node whose key is in sorted vals[lo:hi].
+        return the new root of the subtree.
+        """
+        if lo >= hi or node is None:
+            return node
+        left, right = self._detach(node)
+        i = bisect_left(vals, node.val, lo, hi)
+        j = bisect_right(vals, node.val, i, hi)
+        # equal keys can sit on both sides of node
+        left = self._deleteSorted(left, vals, lo, j)
+        right = self._deleteSorted(right, vals, i, hi)
+        if i < j and not (self.multiset and j - i < node.count):
+            return self._join2(left, right)
+        if i < j:
+            node.count -= j - i
+        return self._join(left, node, right)
+
+    def _intersection(self, t1, t2):
+        if t1 is None or t2 is None:
+            return None
+        left2, right2 = self._detach(t2)
+        left1, rest = self._split(t1, t2.val, False)
+        equal1, right1 = self._split(rest, t2.val, True)
+        if equal1 and self.multiset:
+            equal1.count = min(equal1.count, t2.count)
+            self._recomputeSize(equal1)
+        left = self._join2(self._intersection(left1, left2), equal1)
+        return self._join2(left, self._intersection(right1, right2))
+
+    def _difference(self, t1, t2):
+        if t1 is None or t2 is None:
+            return t1
+        left2, right2 = self._detach(t2)
+        left1, rest = self._split(t1, t2.val, False)
+        equal1, right1 = self._split(rest, t2.val, True) # drop the equal keys of t1
+        left = self._difference(left1, left2)
+        if equal1 and self.multiset and equal1.count > t2.count:
+            equal1.count -= t2.count
+            self._recomputeSize(equal1)
+            left = self._join2(left, equal1)
+        return self._join2(left, self._difference(right1, right2))
 
     def inOrder(self):
         res = []
-        def _dfs_in_order(node, res):
-            if not node:
-                return
-            _dfs_in_order(node.left,res)
-            res.append(node.val)
-            _dfs_in_order(node.right,res)
-        _dfs_in_order(self.root, res)
+        stack = []
+        node = self.root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            if node.count == 1:
+                res.append(node.val)
+            else:
+                res.extend([node.val] * node.count)
+            node = node.right
         return res
     
     def preOrder(self):
         res = []
-        def _dfs_pre_order(node, res):
-            if not node:
-                return
-            res.append(node.val)
-            _dfs_pre_order(node.left,res)
-            _dfs_pre_order(node.right,res)
-        _dfs_pre_order(self.root, res)
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            if node.count == 1:
+                res.append(node.val)
+            else:
+                res.extend([node.val] * node.count)
+            if node.right:
+                stack.append(node.right)
+            if node.left:
+                stack.append(node.left)
         return res
     
     def postOrder(self):
+        # node-right-left pre-order, reversed
         res = []
-        def _dfs_post_order(node, res):
-            if not node:
-                return
-            _dfs_post_order(node.left,res)
-            _dfs_post_order(node.right,res)
-            res.append(node.val)
-        _dfs_post_order(self.root, res)
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            if node.count == 1:
+                res.append(node.val)
+            else:
+                res.extend([node.val] * node.count)
+            if node.left:
+                stack.append(node.left)
+            if node.right:
+                stack.append(node.right)
+        res.reverse()
         return res
     
+    def __iter__(self):
+        return self.irange()
+
+    def irange(self, lo = None, hi = None, reverse = False):
+        """
+        Lazily iterate the vals in the closed range [lo, hi] in sorted order.
+        lo/hi of None means unbounded. Seek to the first val in O(logN), then
+        yield one by one with O(height) memory.
+        """
+        for node in self._iterNodes(lo, hi, reverse):
+            yield node.val
+            if node.count > 1:
+                for _ in range(node.count - 1):
+                    yield node.val
+
+    def _iterNodes(self, lo, hi, reverse):
+        """
+        Helper generator for irange, in-order walk with an explicit stack.
+        """
+        stack = []
+        node = self.root
+        if not reverse:
+            while node:
+                if lo is not None and node.val < lo:
+                    node = node.right
+                else:
+                    stack.append(node)
+                    node = node.left
+            while stack:
+                node = stack.pop()
+                if hi is not None and node.val > hi:
+                    return
+                yield node
+                node = node.right
+                while node:
+                    stack.append(node)
+                    node = node.left
+        else:
+            while node:
+                if hi is not None and node.val > hi:
+                    node = node.left
+                else:
+                    stack.append(node)
+                    node = node.right
+            while stack:
+                node = stack.pop()
+                if lo is not None and node.val < lo:
+                    return
+                yield node
+                node = node.left
+                while node:
+                    stack.append(node)
+                    node = node.right
+
     @classmethod
-    def buildFromList(cls, l, shuffle = True):
+    def buildFromList(cls, l, shuffle = True, key = None, multiset = False):
         """
         return a AVLTree object from l.
-        suffle the list first for better balance.
-        """
-        if shuffle:
-            random.seed()
-            random.shuffle(l)
-        AVL = AVLTree()
-        for item in l:
-            AVL.insert(item)
+        sorted input is bulk loaded into a perfectly balanced tree in O(n),
+        other input is sorted into a copy first. l itself is never modified.
+        shuffle is kept for backward compatibility, the result is always balanced.
+        with a key function, items of l are stored as payloads under key(item).
+        in multiset mode equal vals become one node with a count.
+        """
+        vals, payloads = cls._sortBatch(l, key)
+        AVL = cls(key = key, multiset = multiset)
+        counts = None
+        if multiset and vals:
+            # keep the first val of every run of equal vals
+            starts = [0] + [i for i in range(1, len(vals)) if vals[i - 1] != vals[i]]
+            counts = [b - a for a, b in zip(starts, starts[1:] + [len(vals)])]
+            if payloads is not None:
+                payloads = [payloads[i] for i in starts]
+            vals = [vals[i] for i in starts]
+        AVL.root = AVL._buildBalanced(vals, 0, len(vals) - 1, None, payloads, counts)
+        AVL.nodes_count = AVL.root.size if AVL.root else 0
         return AVL
+
+    @classmethod
+    def _sortBatch(cls, l, key):
+        """
+        return (sorted keys, payloads in the same order) for the items of l, l is not modified.
+        payloads is None without a key function.
+        """
+        if not isinstance(l, list):
+            l = list(l)
+        if key is None:
+            return (l if cls._isSorted(l) else sorted(l)), None
+        vals = list(map(key, l))
+        if cls._isSorted(vals):
+            return vals, l
+        order = sorted(range(len(l)), key = vals.__getitem__)
+        return [vals[i] for i in order], [l[i] for i in order]
+
+    @staticmethod
+    def _isSorted(l):
+        """
+        check l is in non-decreasing order, in one C-level pass.
+        """
+        return all(map(operator.le, l, islice(l, 1, None)))
+
+    def _buildBalanced(self, vals, lo, hi, parent, payloads = None, counts = None):
+        """
+        Helper function to build a perfectly balanced subtree from sorted vals[lo..hi].
+        return the root of the subtree, with height and parent links set.
+        """
+        if lo > hi:
+            return None
+        mid = (lo + hi) // 2
+        node = AVLNode(vals[mid], payloads[mid] if payloads is not None else None)
+        if counts is not None:
+            node.count = counts[mid]
+        node.parent = parent
+        node.left = self._buildBalanced(vals, lo, mid - 1, node, payloads, counts)
+        node.right = self._buildBalanced(vals, mid + 1, hi, node, payloads, counts)
+        node.height = node.maxChildrenHeight() + 1
+        self._recomputeSize(node)
+        return node
     
     def visulize(self):
         """
@@ -594,4 +1606,43 @@ if __name__ == "__main__":
     print("Total Depth:",new_AVL.getDepth())
     print("Total rebalance: ",new_AVL.rebalance_count)
     print("Test inOrder:",  new_AVL.inOrder()==list(range(2**16)))
+    print("----------------------------------------")
+    # Order statistics and range queries
+    T = AVLTree.buildFromList([5, 1, 9, 3, 7])
+    print("rank(7):", T.rank(7), "select(0):", T.select(0), "countRange(2, 8):", T.countRange(2, 8))
+    print("irange(2, 8):", list(T.irange(2, 8)), "reversed:", list(T.irange(2, 8, reverse = True)))
+    print("floor(6):", T.floor(6), "ceiling(6):", T.ceiling(6), "min:", T.min(), "max:", T.max())
+    cursor = T.cursor(3)
+    cursor.next()
+    print("cursor(3).next():", cursor.val)
+    # Map mode
+    M = AVLTree()
+    M["b"] = 2
+    M["a"] = 1
+    M["c"] = 3
+    del M["b"]
+    print("Map items:", list(M.items()), "get('z', 0):", M.get("z", 0))
+    # Multiset mode
+    S = AVLTree.buildFromList([3, 1, 3, 3, 2], multiset = True)
+    S.delete(3)
+    print("Multiset inOrder:", S.inOrder(), "count(3):", S.count(3), "nodes:", S.countNodes())
+    # Batch update
+    T.insertMany([2, 4, 6, 8])
+    print("insertMany:", T.inOrder(), "deleteMany:", T.deleteMany([1, 2, 9]), T.inOrder())
+    # Join based
+    right = T.split(5)
+    print("split(5):", T.inOrder(), right.inOrder())
+    T.join(right)
+    print("join:", T.inOrder())
+    A = AVLTree.buildFromList([1, 2, 3, 4])
+    A.union(AVLTree.buildFromList([3, 4, 5]))
+    print("union:", A.inOrder())
+    A.intersection(AVLTree.buildFromList([2, 3, 5, 8]))
+    print("intersection:", A.inOrder())
+    A.difference(AVLTree.buildFromList([3]))
+    print("difference:", A.inOrder())
+    print("deleteRange(4, 7):", T.deleteRange(4, 7), T.inOrder())
+    # Aggregate
+    T.setAggregate(lambda a, b: a + b, 0, lambda key, payload: key)
+    print("aggregate sum:", T.aggregate(), "sum of [3, 8]:", T.aggregate(3, 8))
     print("[END]Test Implementation of AVLTree.")
@@ -0,0 +1,394 @@
+"""
+B+ Tree.
+
+Balanced Search Tree with high fanout. A node keeps up to "order" sorted keys in a plain list and
+is searched with bisect, so a lookup touches O(log_order N) nodes instead of O(log2 N) AVLNodes.
+All vals live in the leaves, the leaves are linked in both directions for range scans.
+
+Convention:
+
+- "key" and "val" are almost the same in this implementation. use term "key" for search and delete a particular node. use term "val" for other cases
+- equal vals are allowed, same as AVLTree.
+- every node except the root holds at least order // 2 keys (leaves) or children (internal nodes).
+
+API:
+
+- insert(self, val)
+- delete(self, key)
+- search(self, key)
+- getDepth(self)
+- inOrder(self)
+- countNodes(self)
+- buildFromList(cls, l, shuffle, order)
+- irange(self, lo, hi, reverse)
+- __iter__(self)
+- min(self) / max(self)
+
+Reference: https://en.wikipedia.org/wiki/B%2B_tree
+"""
+
+from bisect import bisect_left, bisect_right, insort_right
+from itertools import islice
+import operator
+
+
+class BTreeLeaf:
+    __slots__ = ("keys", "prev", "next")
+
+    def __init__(self, keys = None):
+        self.keys = keys if keys is not None else []
+        self.prev = None
+        self.next = None
+
+    def isLeaf(self):
+        return True
+
+    def __str__(self):
+        return "BTreeLeaf(" + str(self.keys) + ")"
+
+
+class BTreeInternal:
+    # children[i] holds keys between keys[i - 1] and keys[i], both ends inclusive
+    __slots__ = ("keys", "children")
+
+    def __init__(self, keys, children):
+        self.keys = keys
+        self.children = children
+
+    def isLeaf(self):
+        return False
+
+    def __str__(self):
+        return "BTreeInternal(" + str(self.keys) + ")"
+
+
+class BTree:
+    def __init__(self, order = 128):
+        assert order >= 4, "order must be at least 4"
+        self.order = order
+        self.root = BTreeLeaf()
+        self.depth = 0
+        self.nodes_count = 0
+
+    def countNodes(self):
+        """
+        number of vals in the BTree, the same as AVLTree.countNodes.
+        """
+        return self.nodes_count
+
+    def __len__(self):
+        return self.nodes_count
+
+    def __contains__(self, key):
+        return self.search(key) is not None
+
+    def getDepth(self):
+        """
+        Get the max depth of the BTree, 0 for a single leaf.
+        """
+        if self.nodes_count:
+            return self.depth
+        else:
+            return -1
+
+    def insert(self, val):
+        """
+        insert a val into BTree. O(order + log(N))
+        """
+        order = self.order
+        path = []
+        node = self.root
+        for _ in range(self.depth):
+            i = bisect_right(node.keys, val)
+            path.append((node, i))
+            node = node.children[i]
+        insort_right(node.keys, val)
+        self.nodes_count += 1
+        if len(node.keys) <= order:
+            return
+        # split the leaf, the separator is the first key of the new right leaf
+        mid = len(node.keys) // 2
+        right = BTreeLeaf(node.keys[mid:])
+        del node.keys[mid:]
+        right.next = node.next
+        if node.next:
+            node.next.prev = right
+        node.next = right
+        right.prev = node
+        sep = right.keys[0]
+        # push the split up the path
+        while path:
+            node, i = path.pop()
+            node.keys.insert(i, sep)
+            node.children.insert(i + 1, right)
+            if len(node.children) <= order:
+                return
+            mid = len(node.keys) // 2
+            sep = node.keys[mid]
+            right = BTreeInternal(node.keys[mid + 1:], node.children[mid + 1:])
+            del node.keys[mid:]
+            del node.children[mid + 1:]
+        self.root = BTreeInternal([sep], [self.root, right])
+        self.depth += 1
+
+    def search(self, key):
+        """
+        Search the BTreeLeaf holding key.
+        if found return BTreeLeaf, else return None.
+        """
+        node = self.root
+        for _ in range(self.depth):
+            node = node.children[bisect_left(node.keys, key)]
+        keys = node.keys
+        i = bisect_left(keys, key)
+        if i < len(keys):
+            return node if keys[i] == key else None
+        # every key of this leaf is smaller, key can only start the next leaf
+        node = node.next
+        return node if node is not None and node.keys[0] == key else None
+
+    def delete(self, key):
+        """
+        Delete a key from BTree. O(order + log(N))
+        """
+        path = []
+        node = self.root
+        for _ in range(self.depth):
+            i = bisect_left(node.keys, key)
+            path.append((node, i))
+            node = node.children[i]
+        i = bisect_left(node.keys, key)
+        if i == len(node.keys):
+            # key can only start the next leaf, step the path to it
+            level = len(path) - 1
+            while level >= 0 and path[level][1] == len(path[level][0].keys):
+                level -= 1
+            if level < 0:
+                return
+            parent, j = path[level]
+            del path[level:]
+            path.append((parent, j + 1))
+            node = parent.children[j + 1]
+            while not node.isLeaf():
+                path.append((node, 0))
+                node = node.children[0]
+            i = 0
+        if node.keys[i] != key:
+            return
+        del node.keys[i]
+        self.nodes_count -= 1
+        self._fixUnderflow(node, path)
+
+    def _fixUnderflow(self, node, path):
+        """
+        Borrow from or merge with a sibling while node has less than order // 2 keys or children.
+        path is the list of (parent, child index) from the root down to node.
+        """
+        half = self.order // 2
+        while path:
+            if node.isLeaf():
+                if len(node.keys) >= half:
+                    return
+            elif len(node.children) >= half:
+                return
+            parent, i = path.pop()
+            left = parent.children[i - 1] if i > 0 else None
+            right = parent.children[i + 1] if i + 1 < len(parent.children) else None
+            if node.isLeaf():
+                if left is not None and len(left.keys) > half:
+                    node.keys.insert(0, left.keys.pop())
+                    parent.keys[i - 1] = node.keys[0]
+                    return
+                if right is not None and len(right.keys) > half:
+                    node.keys.append(right.keys.pop(0))
+                    parent.keys[i] = right.keys[0]
+                    return
+                if left is None:
+                    left, node, i = node, right, i + 1
+                # merge node into left
+                left.keys.extend(node.keys)
+                left.next = node.next
+                if node.next:
+                    node.next.prev = left
+            else:
+                if left is not None and len(left.children) > half:
+                    node.children.insert(0, left.children.pop())
+                    node.keys.insert(0, parent.keys[i - 1])
+                    parent.keys[i - 1] = left.keys.pop()
+                    return
+                if right is not None and len(right.children) > half:
+                    node.children.append(right.children.pop(0))
+                    node.keys.append(parent.keys[i])
+                    parent.keys[i] = right.keys.pop(0)
+                    return
+                if left is None:
+                    left, node, i = node, right, i + 1
+                # merge node into left, pulling the separator down
+                left.keys.append(parent.keys[i - 1])
+                left.keys.extend(node.keys)
+                left.children.extend(node.children)
+            del parent.keys[i - 1]
+            del parent.children[i]
+            node = parent
+        if not node.isLeaf() and len(node.children) == 1:
+            # the root lost its last separator
+            self.root = node.children[0]
+            self.depth -= 1
+
+    def min(self):
+        """
+        return the smallest val, None if the BTree is empty.
+        """
+        if not self.nodes_count:
+            return None
+        return self._firstLeaf().keys[0]
+
+    def max(self):
+        """
+        return the biggest val, None if the BTree is empty.
+        """
+        if not self.nodes_count:
+            return None
+        return self._lastLeaf().keys[-1]
+
+    def _firstLeaf(self):
+        node = self.root
+        for _ in range(self.depth):
+            node = node.children[0]
+        return node
+
+    def _lastLeaf(self):
+        node = self.root
+        for _ in range(self.depth):
+            node = node.children[-1]
+        return node
+
+    def inOrder(self):
+        res = []
+        leaf = self._firstLeaf()
+        while leaf:
+            res.extend(leaf.keys)
+            leaf = leaf.next
+        return res
+
+    def __iter__(self):
+        return self.irange()
+
+    def irange(self, lo = None, hi = None, reverse = False):
+        """
+        Lazily iterate the vals in the closed range [lo, hi] in sorted order.
+        lo/hi of None means unbounded. The leaves are walked through their links.
+        """
+        if not reverse:
+            if lo is None:
+                leaf, i = self._firstLeaf(), 0
+            else:
+                leaf = self.root
+                for _ in range(self.depth):
+                    leaf = leaf.children[bisect_left(leaf.keys, lo)]
+                i = bisect_left(leaf.keys, lo)
+            while leaf:
+                keys = leaf.keys
+                if hi is not None and keys and keys[-1] > hi:
+                    yield from islice(keys, i, bisect_right(keys, hi))
+                    return
+                yield from islice(keys, i, None)
+                leaf, i = leaf.next, 0
+        else:
+            if hi is None:
+                leaf = self._lastLeaf()
+                i = len(leaf.keys)
+            else:
+                leaf = self.root
+                for _ in range(self.depth):
+                    leaf = leaf.children[bisect_right(leaf.keys, hi)]
+                i = bisect_right(leaf.keys, hi)
+            while leaf:
+                keys = leaf.keys
+                if lo is not None and keys and keys[0] < lo:
+                    yield from reversed(keys[bisect_left(keys, lo):i])
+                    return
+                yield from reversed(keys[:i])
+                leaf = leaf.prev
+                i = len(leaf.keys) if leaf else 0
+
+    @classmethod
+    def buildFromList(cls, l, shuffle = True, order = 128):
+        """
+        return a BTree object from l, in O(n) for sorted input. l is not modified.
+        the leaves are filled evenly, leaving room for later inserts.
+        shuffle is ignored, kept for the same signature as AVLTree.buildFromList.
+        """
+        if not isinstance(l, list):
+            l = list(l)
+        if not all(map(operator.le, l, islice(l, 1, None))):
+            l = sorted(l)
+        T = cls(order)
+        if not l:
+            return T
+        # leaves are filled to 3/4 of order
+        fill = max(order * 3 // 4, order // 2)
+        nodes = []
+        for chunk in cls._chunks(len(l), fill, order // 2):
+            leaf = BTreeLeaf(l[chunk[0]:chunk[1]])
+            if nodes:
+                nodes[-1].next = leaf
+                leaf.prev = nodes[-1]
+            nodes.append(leaf)
+        mins = [leaf.keys[0] for leaf in nodes]
+        while len(nodes) > 1:
+            parents = []
+            parent_mins = []
+            for a, b in cls._chunks(len(nodes), fill, order // 2):
+                parents.append(BTreeInternal(mins[a + 1:b], nodes[a:b]))
+                parent_mins.append(mins[a])
+            nodes, mins = parents, parent_mins
+            T.depth += 1
+        T.root = nodes[0]
+        T.nodes_count = len(l)
+        return T
+
+    @staticmethod
+    def _chunks(n, fill, half):
+        """
+        split range(n) into slices of almost equal length near fill, but never shorter than half, as (start, end) pairs.
+        """
+        k = max(1, min(-(-n // fill), n // half))
+        return [(n * j // k, n * (j + 1) // k) for j in range(k)]
+
+    def visulize(self):
+        """
+        Naive Visulization, one line per level.
+        Warn: Only for simple test usage.
+        """
+        if not self.nodes_count:
+            print("EMPTY TREE.")
+            return
+        print("-----------------Visualize Tree----------------------")
+        layer = [self.root]
+        while layer:
+            print(*(node.keys for node in layer), sep="  ")
+            layer = [child for node in layer if not node.isLeaf() for child in node.children]
+        print("-----------------End Visualization-------------------")
+
+
+if __name__ == "__main__":
+    print("[BEGIN]Test Implementation of BTree.")
+    T = BTree(order = 4)
+    for i in [5, 1, 9, 3, 7, 2, 8, 6, 4, 0]:
+        T.insert(i)
+    T.visulize()
+    print("Total nodes: ", T.countNodes())
+    print("Total depth: ", T.getDepth())
+    for i in [3, 7, 0, 9]:
+        T.delete(i)
+    T.visulize()
+    print("inOrder:", T.inOrder())
+    print("irange(2, 6):", list(T.irange(2, 6)))
+    print("----------------------------------------")
+    input_list = list(range(2**16))
+    new_T = BTree.buildFromList(input_list)
+    print("Total Nodes:", new_T.countNodes())
+    print("Total Depth:", new_T.getDepth())
+    print("Test inOrder:", new_T.inOrder() == input_list)
+    print("[END]Test Implementation of BTree.")
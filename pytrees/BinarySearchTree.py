@@ -18,6 +18,8 @@ API:
 - postOrder(self)
 - countNodes(self)
 - buildFromList(cls, l)
+- irange(self, lo, hi, reverse)
+- __iter__(self)
 
 Author: Yi Zhou
 Date: May 18, 2018 
@@ -199,6 +201,57 @@ class BinarySearchTree:
         _dfs_post_order(self.root, res)
         return res
     
+    def __iter__(self):
+        return self.irange()
+
+    def irange(self, lo = None, hi = None, reverse = False):
+        """
+        Lazily iterate the vals in the closed range [lo, hi] in sorted order.
+        lo/hi of None means unbounded. Seek to the first val in O(logN), then
+        yield one by one with O(height) memory.
+        """
+        for node in self._iterNodes(lo, hi, reverse):
+            yield node.val
+
+    def _iterNodes(self, lo, hi, reverse):
+        """
+        Helper generator for irange, in-order walk with an explicit stack.
+        """
+        stack = []
+        node = self.root
+        if not reverse:
+            while node:
+                if lo is not None and node.val < lo:
+                    node = node.right
+                else:
+                    stack.append(node)
+                    node = node.left
+            while stack:
+                node = stack.pop()
+                if hi is not None and node.val > hi:
+                    return
+                yield node
+                node = node.right
+                while node:
+                    stack.append(node)
+                    node = node.left
+        else:
+            while node:
+                if hi is not None and node.val > hi:
+                    node = node.left
+                else:
+                    stack.append(node)
+                    node = node.right
+            while stack:
+                node = stack.pop()
+                if lo is not None and node.val < lo:
+                    return
+                yield node
+                node = node.left
+                while node:
+                    stack.append(node)
+                    node = node.right
+
     @classmethod
     def buildFromList(cls, l):
         """
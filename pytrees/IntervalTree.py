@@ -13,6 +13,15 @@ API:
 
 - queryOverlap(self, val)
 - queryAllOverlaps(self, val)
+- iterOverlaps(self, val, limit)
+- queryAllOverlapsBatch(self, queries)
+- queryAllOverlapsParallel(self, queries, workers, chunksize, mp_context)
+- countOverlaps(self, val)
+- stab(self, point) / countStab(self, point)
+- overlapJoin(self, other)
+- nearestLeft(self, val) / nearestRight(self, val)
+- gaps(self, lo, hi)
+- coveredLength(self, lo, hi) / coveredIntervals(self, lo, hi)
 - insert(self, val)
 - delete(self, key)
 - search(self, key)
@@ -22,6 +31,18 @@ API:
 - postOrder(self)
 - countNodes(self)
 - buildFromList(cls, l)
+- count(self, key)
+
+Multiset mode, IntervalTree(multiset=True): equal intervals share one node with a count.
+
+Payload mode, IntervalTree(withPayload=True): insert(val, payload) puts payload in the bucket of the node of val,
+delete(key, payload) removes that copy. queries return (interval, payload) pairs.
+
+Ends index, IntervalTree(trackEnds=True): countOverlaps, countStab and nearestLeft read a second AVLTree
+of the intervals keyed by end, kept up to date by every insert and delete.
+
+Coverage index, IntervalTree(trackCoverage=True): coveredLength and coveredIntervals read an AVLTree map
+of the coverage deltas, kept up to date by every insert and delete. gaps uses it when present.
 
 
 Author: Yi Zhou
@@ -31,21 +52,32 @@ Reference: https://en.wikipedia.org/wiki/Interval_tree
 """
 
 
+from bisect import bisect_right
 from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from heapq import heappop, heappush
+from operator import itemgetter
+import os
 import random
 
+try:
+    from pytrees.AVLTree import AVLTree
+except ImportError: # run as a script from inside pytrees/
+    from AVLTree import AVLTree
+
 
 class IntervalNode:
     def __init__(self, val):
-        assert len(val) == 2
-        assert val[0] <= val[1]
-        val = tuple(val) 
+        # val is a tuple already checked by IntervalTree._checkInterval
         self.val = val
         self.parent = None
         self.left = None
         self.right = None 
         self.height = 0
+        self.count = 1 # copies of the interval, only above 1 in multiset mode
+        self.payloads = None # payload of every copy, len(payloads) == count, only in payload mode
         self.maxRight = val[1] # Augmented DataStructure: Store the max right value of the subtree rooted at this node
+        self.size = 1 # Augmented DataStructure: number of intervals (counting copies) in the subtree rooted at this node
 
     def isLeaf(self):
         return (self.height == 0)
@@ -67,17 +99,73 @@ class IntervalNode:
         return "IntervalNode("+ str(self.val)+ ", maxRight: %d )" % self.maxRight
     
 
+_ANY = object() # delete(key) without a payload drops any copy
+
+
+def _measureCover(key, item):
+    # a single key of the coverage index, no range after it yet
+    return (key, key, item[1], None, 0)
+
+
+def _combineCover(a, b):
+    """
+    aggregate of the coverage index: (first key, last key, sum of deltas, min coverage, length at min) of a run of keys.
+    the coverage between two neighbouring keys is the sum of the deltas up to the first one,
+    min coverage is None for a single key, there is nothing between. None is the identity.
+    """
+    if a is None:
+        return b
+    if b is None:
+        return a
+    a_first, a_last, a_sum, a_min, a_len = a
+    b_first, b_last, b_sum, b_min, b_len = b
+    # the keys of a, the range between a and b at coverage a_sum, the keys of b shifted by a_sum
+    res_min, res_len = a_sum, b_first - a_last
+    if a_min is not None:
+        if a_min < res_min:
+            res_min, res_len = a_min, a_len
+        elif a_min == res_min:
+            res_len += a_len
+    if b_min is not None:
+        b_min += a_sum
+        if b_min < res_min:
+            res_min, res_len = b_min, b_len
+        elif b_min == res_min:
+            res_len += b_len
+    return (a_first, b_last, a_sum + b_sum, res_min, res_len)
+
+
 class IntervalTree:
-    def __init__(self):
+    def __init__(self, multiset = False, withPayload = False, trackEnds = False, trackCoverage = False):
+        """
+        multiset: store equal intervals as one node with a count instead of one node per copy.
+        withPayload: every interval carries a payload, equal intervals share one node with a bucket of payloads.
+        queries return (interval, payload) pairs. implies multiset.
+        trackEnds: keep a second AVLTree of the intervals keyed by end for countOverlaps, countStab and nearestLeft.
+        every insert and delete also updates it, which about doubles their cost.
+        trackCoverage: keep an AVLTree map of the coverage deltas with an aggregate for coveredLength,
+        coveredIntervals and the O(logN) per gap path of gaps. every insert and delete also updates it, about 5x the cost of a plain update.
+        """
         self.root = None
         self.rebalance_count = 0
         self.nodes_count = 0
+        self.multiset = multiset or withPayload
+        self.withPayload = withPayload
+        self.trackEnds = trackEnds
+        # (end, start) of every interval for countOverlaps and nearestLeft, only with trackEnds
+        self._ends = AVLTree(multiset = True) if trackEnds else None
+        self.trackCoverage = trackCoverage
+        # coordinate -> (coordinate, coverage delta) for coveredLength, only with trackCoverage
+        self._cover = None
+        if trackCoverage:
+            self._cover = AVLTree()
+            self._cover.setAggregate(_combineCover, None, _measureCover)
     
     def setRoot(self, val):
         """
         Set the root value
         """
-        self.root = IntervalNode(val)
+        self.root = IntervalNode(self._checkInterval(val))
     
     def countNodes(self):
         return self.nodes_count
@@ -86,107 +174,564 @@ class IntervalTree:
         """
         val should be an input interval.
         return IntervalNode that overlaps with the input interval that we find first in the IntervalTree.
+        in payload mode return (interval, payload) of its first copy.
         if not found, return None
         """
-        assert len(val) == 2
-        assert val[1] >= val[0]
-        val = tuple(val)
-        return self._dfsQueryOverlap(self.root, val)
-    
-    def _dfsQueryOverlap(self, node, val):
-        """
-        Helper function for query.
-        return the first interval we find in the subtree rooted at node.
-        """
-        if not node: return None 
-        if self._isOverlap(node.val, val):
-            return node.val
-        else:
-            L, R = val
-            if R < node.val[0]:
+        L, R = self._checkInterval(val)
+        node = self.root
+        while node is not None:
+            start, end = node.val
+            if start <= R and L <= end:
+                if node.payloads is not None:
+                    return (node.val, node.payloads[0])
+                return node.val
+            if R < start:
                 # Case1
                 #  Right subtree can't overlap, search left
                 # ----- val
                 #        ------ node.val
                 #        /    \
                 #     ----    -----
-                return self._dfsQueryOverlap(node.left, val)
-            elif L > node.val[1]:
-                z = node.left.maxRight if node.left else (-float("inf"))
-                if z >= L:
-                    # Case2
-                    # Left subtree guranteed overlap
-                    #               L-----R 
-                    #        ------ node.val
-                    #        /    
-                    #     -----.......z   
-                    return self._dfsQueryOverlap(node.left, val)
-                else:
-                    # Case3
-                    # Left subtree no overlap, search right
-                    #               L-----R 
-                    #        ------ node.val
-                    #        /    
-                    #     -----..z  
-                    return self._dfsQueryOverlap(node.right, val)
-            return None
+                node = node.left
+            elif node.left is not None and node.left.maxRight >= L:
+                # Case2
+                # Left subtree guranteed overlap
+                #               L-----R 
+                #        ------ node.val
+                #        /    
+                #     -----.......z   
+                node = node.left
+            else:
+                # Case3
+                # Left subtree no overlap, search right
+                #               L-----R 
+                #        ------ node.val
+                #        /    
+                #     -----..z  
+                node = node.right
+        return None
+
+    def _checkInterval(self, val):
+        """
+        validate an input interval once per call, return it as a tuple.
+        """
+        assert len(val) == 2
+        assert val[1] >= val[0]
+        return val if type(val) is tuple else tuple(val)
     
     def queryAllOverlaps(self, val):
         """
         find all the intervals in the interval tree.
 
-        return a list of all intervals that overlap with val.
+        return a list of all intervals that overlap with val, sorted.
+        in payload mode the list holds (interval, payload) pairs.
         """
-        assert len(val) == 2
-        assert val[1] >= val[0]
-        val = tuple(val)
+        return list(self.iterOverlaps(val))
+
+    def iterOverlaps(self, val, limit = None):
+        """
+        Lazily iterate the intervals that overlap with val, sorted. (interval, payload) pairs in payload mode.
+        stop after limit intervals if limit is not None. val is checked once, when called.
+        The IntervalTree must not be modified during the iteration.
+        """
+        L, R = self._checkInterval(val)
+        assert limit is None or limit >= 0
+        return self._iterOverlaps(L, R, limit)
+
+    def _iterOverlaps(self, L, R, limit):
+        """
+        Helper generator for iterOverlaps, in-order walk with an explicit stack.
+        a subtree is entered only if its maxRight reaches L, the walk ends at the first start beyond R.
+        """
+        if limit == 0:
+            return
+        found = 0
+        stack = []
+        push, pop = stack.append, stack.pop
+        node = self.root
+        while True:
+            while node is not None and node.maxRight >= L:
+                push(node)
+                node = node.left
+            if not stack:
+                return
+            node = pop()
+            val = node.val
+            if val[0] > R:
+                # every interval after this one in order starts beyond R
+                return
+            if val[1] >= L:
+                if node.payloads is not None:
+                    for payload in node.payloads:
+                        yield (val, payload)
+                        found += 1
+                        if found == limit:
+                            return
+                elif node.count == 1:
+                    yield val
+                    found += 1
+                    if found == limit:
+                        return
+                else:
+                    for _ in range(node.count):
+                        yield val
+                        found += 1
+                        if found == limit:
+                            return
+            node = node.right
+
+    def queryAllOverlapsBatch(self, queries):
+        """
+        answer many queryAllOverlaps at once in a single traversal.
+        return a list with, for every query in input order, the sorted list of intervals that overlap with it.
+        the queries are sorted by L once, a node passes down only the prefix of them whose L <= its maxRight,
+        and the right subtree only the ones whose R reaches the node start.
+        """
+        queries = [self._checkInterval(q) for q in queries]
+        res = [[] for _ in queries]
+        order = sorted(range(len(queries)), key = lambda i: queries[i][0])
+        Ls = [queries[i][0] for i in order]
+        self._dfsBatch(self.root, queries, order, Ls, res)
+        return res
+
+    def queryAllOverlapsParallel(self, queries, workers = None, chunksize = None, mp_context = None):
+        """
+        same result as queryAllOverlapsBatch, computed by a pool of worker processes.
+        the tree is sent once to every worker by the pool initializer, tasks only carry queries.
+        mp_context is passed to the ProcessPoolExecutor, None uses the default start method.
+        with fork the workers inherit the tree, with spawn or forkserver it is pickled once per worker,
+        which costs about as much as building it.
+        the queries are sorted by L and cut into chunks of neighbouring queries, so every chunk
+        walks its own part of the tree, results are put back in input order.
+        workers defaults to os.cpu_count(), with one worker or one chunk no process is started.
+        intervals and payloads should be picklable.
+        """
+        queries = [self._checkInterval(q) for q in queries]
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if chunksize is None:
+            # a few chunks per worker to even out their cost
+            chunksize = max(1, -(-len(queries) // (workers * 4)))
+        if workers <= 1 or len(queries) <= chunksize:
+            return self.queryAllOverlapsBatch(queries)
+        order = sorted(range(len(queries)), key = lambda i: queries[i][0])
+        chunks = []
+        for i in range(0, len(order), chunksize):
+            chunks.append([queries[j] for j in order[i:i + chunksize]])
+        res = [None] * len(queries)
+        pos = 0
+        with ProcessPoolExecutor(workers, mp_context = mp_context, initializer = _initQueryWorker, initargs = (self,)) as executor:
+            for part in executor.map(_queryChunk, chunks):
+                for hits in part:
+                    res[order[pos]] = hits
+                    pos += 1
+        return res
+
+    def _dfsBatch(self, node, queries, order, Ls, res):
+        """
+        Helper function for queryAllOverlapsBatch, in-order so every result list comes out sorted.
+        order holds query indices sorted by L, Ls their L values.
+        """
+        if node is None or not order:
+            return
+        k = bisect_right(Ls, node.maxRight)
+        if k < len(order):
+            # the other queries start beyond every interval of this subtree
+            order, Ls = order[:k], Ls[:k]
+            if not k:
+                return
+        self._dfsBatch(node.left, queries, order, Ls, res)
+        start, end = val = node.val
+        right_order = []
+        right_Ls = []
+        for i in order:
+            L, R = queries[i]
+            if R >= start:
+                right_order.append(i)
+                right_Ls.append(L)
+                if L <= end:
+                    if node.payloads is not None:
+                        res[i].extend([(val, payload) for payload in node.payloads])
+                    elif node.count == 1:
+                        res[i].append(val)
+                    else:
+                        res[i].extend([val] * node.count)
+        self._dfsBatch(node.right, queries, right_order, right_Ls, res)
+
+    def countOverlaps(self, val):
+        """
+        return the number of intervals that overlap with val, without listing them. O(logN)
+        the intervals ending before L all start before R, so the answer is #(start <= R) - #(end < L):
+        the first term from the size augmentation, the second from a sorted multiset of the ends.
+        needs IntervalTree(trackEnds=True).
+        """
+        L, R = self._checkInterval(val)
+        ends = self._endsIndex()
+        res = 0
+        node = self.root
+        while node is not None:
+            if node.val[0] <= R:
+                # node and its whole left subtree start at or before R
+                res += node.count + (node.left.size if node.left else 0)
+                node = node.right
+            else:
+                node = node.left
+        if res:
+            # (L,) sorts before every (L, start)
+            res -= ends.rank((L,))
+        return res
+
+    def _endsIndex(self):
+        """
+        return the AVLTree multiset of the intervals keyed by (end, start).
+        """
+        assert self._ends is not None, "construct the IntervalTree with trackEnds=True to index the ends"
+        return self._ends
+
+    def nearestLeft(self, val):
+        """
+        return the interval ending closest to the left of val (the biggest end < L), None if not found.
+        among equal ends the one starting last. (interval, payload) of its first copy in payload mode. O(logN)
+        uses the same index of the ends as countOverlaps, needs IntervalTree(trackEnds=True).
+        """
+        L, R = self._checkInterval(val)
+        key = self._endsIndex().predecessor((L,))
+        if key is None:
+            return None
+        return self._withPayload(self._dfsSearch(self.root, (key[1], key[0])))
+
+    def nearestRight(self, val):
+        """
+        return the interval starting closest to the right of val (the smallest start > R), None if not found.
+        among equal starts the shortest. (interval, payload) of its first copy in payload mode. O(logN)
+        """
+        L, R = self._checkInterval(val)
+        return self._withPayload(self._nextStartNode(R))
+
+    def _withPayload(self, node):
+        if node is None:
+            return None
+        if node.payloads is not None:
+            return (node.val, node.payloads[0])
+        return node.val
+
+    def _nextStartNode(self, x):
+        """
+        return the first IntervalNode in order with start > x, None if not found.
+        """
+        res = None
+        node = self.root
+        while node is not None:
+            if node.val[0] > x:
+                res = node
+                node = node.left
+            else:
+                node = node.right
+        return res
+
+    def gaps(self, lo, hi):
+        """
+        return the free parts of [lo, hi] as a sorted list of pairs (a, b), a < b:
+        no interval overlaps the open range (a, b), a is lo or the end of a covered run, b is hi or a start.
+        with IntervalTree(trackCoverage=True) a covered run is skipped in O(logN), O(logN) per gap in all.
+        without it a covered run is skipped with O(logN) jumps to the max end of the intervals starting
+        inside it, one jump per interval that pushes the end of the run further: O(logN) per gap plus per jump.
+        """
+        assert lo <= hi
+        if self._cover is None:
+            return self._gapsByJumps(lo, hi)
+        index = self._cover
+        res = []
+        pos = lo
+        covered = self._coverageAt(lo) > 0
+        while True:
+            if covered:
+                pos = self._nextUncovered(pos)
+                if pos >= hi:
+                    return res
+            # the coverage is 0 from pos to the next key
+            key = index.successor(pos)
+            end = hi if key is None or key >= hi else key
+            node = self._nextStartNode(pos)
+            while node is not None and node.val[0] < end:
+                res.append((pos, node.val[0]))
+                pos = node.val[0]
+                node = self._nextStartNode(pos)
+            if pos < end:
+                res.append((pos, end))
+            if end == hi:
+                return res
+            pos = end
+            covered = True
+
+    def _gapsByJumps(self, lo, hi):
+        """
+        gaps without the coverage index, from the maxRight augmentation alone.
+        """
+        res = []
+        pos = lo
+        while True:
+            # skip the covered run reaching pos
+            end = self._maxEndUpTo(pos)
+            while end is not None and end > pos:
+                pos = end
+                if pos >= hi:
+                    return res
+                end = self._maxEndUpTo(pos)
+            # (pos, next start) is free
+            node = self._nextStartNode(pos)
+            if node is None or node.val[0] >= hi:
+                if pos < hi:
+                    res.append((pos, hi))
+                return res
+            res.append((pos, node.val[0]))
+            pos = node.val[0]
+
+    def _maxEndUpTo(self, x):
+        """
+        return the biggest end among the intervals with start <= x, None if there is none. O(logN)
+        """
+        res = None
+        node = self.root
+        while node is not None:
+            if node.val[0] <= x:
+                # node and its whole left subtree start at or before x
+                if res is None or node.val[1] > res:
+                    res = node.val[1]
+                if node.left is not None and node.left.maxRight > res:
+                    res = node.left.maxRight
+                node = node.right
+            else:
+                node = node.left
+        return res
+
+    def coveredLength(self, lo, hi):
+        """
+        return the length of [lo, hi] covered by the union of the intervals. O(logN)
+        every interval [L, R] adds +1 to the coverage at L and -1 at R, the coverage index keeps these deltas
+        by coordinate with an aggregate that gives the length where the coverage is 0.
+        needs IntervalTree(trackCoverage=True).
+        """
+        assert lo <= hi
+        index = self._coverIndex()
+        # coverage just before lo, from the deltas of the keys < lo
+        base = self._coverageAt(lo) - index.get(lo, (lo, 0))[1]
+        # keys in [lo, hi] between two bounds, a key at lo or hi only adds an empty range
+        res = _combineCover((lo, lo, base, None, 0), index.aggregate(lo, hi))
+        res = _combineCover(res, (hi, hi, 0, None, 0))
+        # the coverage is never negative, 0 is the min wherever some length is not covered
+        uncovered = res[4] if res[3] == 0 else 0
+        return hi - lo - uncovered
+
+    def coveredIntervals(self, lo, hi):
+        """
+        return the union of the intervals inside [lo, hi] as a sorted list of disjoint runs (a, b), a < b.
+        runs of a single point are left out, the lengths add up to coveredLength(lo, hi).
+        a run starts at the next key of the coverage index and ends at the first key after it where
+        the coverage drops to 0, found by a descent over the aggregates. O(logN) per run.
+        needs IntervalTree(trackCoverage=True), same as coveredLength.
+        """
+        assert lo <= hi
+        index = self._coverIndex()
         res = []
-        self._dfsFind(self.root, val, res)
+        pos = lo
+        covered = self._coverageAt(lo) > 0
+        while pos < hi:
+            if covered:
+                # the coverage index ends at 0, so the run ends
+                end = self._nextUncovered(pos)
+                res.append((pos, min(end, hi)))
+                pos = end
+                covered = False
+            else:
+                # the coverage only goes up at the next key
+                pos = index.successor(pos)
+                if pos is None:
+                    break
+                covered = True
         return res
-    
-    def _dfsFind(self, node, val, res):
+
+    def _coverageAt(self, x):
         """
-        it should be better then naive iterations.
+        return the coverage right after x, the sum of the deltas of the keys <= x. O(logN)
         """
-        if not node: return None 
+        below = self._cover.aggregate(None, x)
+        return below[2] if below is not None else 0
 
-        if self._isOverlap(node.val, val):
-            res.append(node.val)
-        
+    def _nextUncovered(self, x):
+        """
+        return the first key > x of the coverage index where the coverage drops to 0, None if not found. O(logN)
+        a subtree holds such a key iff the lowest coverage of its keys, min(min coverage, sum of deltas) of its
+        aggregate shifted by the coverage before it, is 0.
+        """
+        index = self._cover
+        base = self._coverageAt(x)
+        # the nodes > x on the search path, each one followed by its right subtree in order
+        path = []
+        node = index.root
+        while node:
+            if node.val > x:
+                path.append(node)
+                node = node.left
+            else:
+                node = node.right
+        subtree = None
+        for node in reversed(path):
+            base += node.payload[1]
+            if base == 0:
+                return node.val
+            right = node.right
+            if right is not None:
+                agg = right.agg
+                low = agg[2] if agg[3] is None or agg[2] < agg[3] else agg[3]
+                if base + low == 0:
+                    subtree = right
+                    break
+                base += agg[2]
+        if subtree is None:
+            return None
+        node = subtree
+        while True:
+            left = node.left
+            if left is not None:
+                agg = left.agg
+                low = agg[2] if agg[3] is None or agg[2] < agg[3] else agg[3]
+                if base + low == 0:
+                    node = left
+                    continue
+                base += agg[2]
+            base += node.payload[1]
+            if base == 0:
+                return node.val
+            node = node.right
+
+    def _coverIndex(self):
+        """
+        return the AVLTree map of the (coordinate, coverage delta) pairs by coordinate.
+        """
+        assert self._cover is not None, "construct the IntervalTree with trackCoverage=True to track the coverage"
+        return self._cover
+
+    def _buildCoverIndex(self):
+        """
+        return a new coverage index of the intervals in the tree. O(NlogN)
+        """
+        deltas = {}
+        for L, R in self.inOrder():
+            if L != R:
+                deltas[L] = deltas.get(L, 0) + 1
+                deltas[R] = deltas.get(R, 0) - 1
+        items = sorted(item for item in deltas.items() if item[1])
+        index = AVLTree.buildFromList(items, key = itemgetter(0))
+        index.setAggregate(_combineCover, None, _measureCover)
+        return index
+
+    def _addCover(self, val, delta):
+        """
+        add delta copies of val to the coverage index.
+        """
         L, R = val
-        if R < node.val[0]:
-            # Case1
-            #  Right subtree can't overlap, search left
-            # ----- val
-            #        ------ node.val
-            #        /    \
-            #     ----    -----
-            self._dfsFind(node.left, val, res)
-        elif L > node.val[1]:
-            z = node.left.maxRight if node.left else (-float("inf"))
-            if z<L:
-                # Case3
-                # Left subtree no overlap, search right
-                #               L-----R 
-                #        ------ node.val
-                #        /    
-                #     -----..z  
-                self._dfsFind(node.right, val, res)
-        else:
-            self._dfsFind(node.left, val, res)
-            self._dfsFind(node.right, val, res)
-        return None
-                
-    def _isOverlap(self, interval1, interval2):
+        if L == R:
+            return
+        index = self._cover
+        for key, d in ((L, delta), (R, -delta)):
+            d += index.get(key, (key, 0))[1]
+            if d:
+                index[key] = (key, d)
+            else:
+                del index[key]
+
+    def stab(self, point):
+        """
+        return a sorted list of the intervals containing point. (interval, payload) pairs in payload mode.
+        """
+        return list(self._iterOverlaps(point, point, None))
+
+    def countStab(self, point):
+        """
+        return the number of intervals containing point. needs IntervalTree(trackEnds=True).
         """
-        check intervals
+        return self.countOverlaps((point, point))
+
+    def overlapJoin(self, other):
+        """
+        Lazily iterate every pair (a, b), a in this IntervalTree and b in other, that overlap.
+        other is an IntervalTree or an iterable of intervals sorted by start.
+        a and b are (interval, payload) pairs for IntervalTrees in payload mode.
+        both sides are swept once in order, keeping the intervals still open in a heap by end:
+        O((|A| + |B|)log + output), no query descends from the root.
+        a pair is yielded when the later starting of its two intervals is reached.
         """
-        l = sorted([interval1, interval2])
-        if l[1][0] <= l[0][1] : 
-            return True
+        left = self._iterItems()
+        if isinstance(other, IntervalTree):
+            right = other._iterItems()
+            right_payload = other.withPayload
         else:
-            return False
-    
+            right = self._iterSortedIntervals(other)
+            right_payload = False
+        return self._sweepJoin(left, self.withPayload, right, right_payload)
+
+    def _iterItems(self):
+        """
+        Helper generator, in-order walk yielding every copy, as (interval, payload) in payload mode.
+        """
+        stack = []
+        node = self.root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            if node.payloads is not None:
+                for payload in node.payloads:
+                    yield (node.val, payload)
+            elif node.count == 1:
+                yield node.val
+            else:
+                for _ in range(node.count):
+                    yield node.val
+            node = node.right
+
+    def _iterSortedIntervals(self, intervals):
+        """
+        Helper generator, check every interval of a sorted iterable as it is consumed.
+        """
+        last = None
+        for val in intervals:
+            val = self._checkInterval(val)
+            assert last is None or last <= val[0], "intervals should be sorted by start"
+            last = val[0]
+            yield val
+
+    def _sweepJoin(self, left, left_payload, right, right_payload):
+        """
+        Helper generator for overlapJoin, merge two streams sorted by start.
+        an interval starting at s pairs with every open interval of the other side, after the ones ending before s are closed.
+        """
+        sides = [(left, left_payload, []), (right, right_payload, [])]
+        heads = [next(left, None), next(right, None)]
+        seq = 0 # heap tie breaker, items need not be comparable
+        while heads[0] is not None or heads[1] is not None:
+            if heads[1] is None:
+                i = 0
+            elif heads[0] is None:
+                i = 1
+            else:
+                start0 = heads[0][0][0] if left_payload else heads[0][0]
+                start1 = heads[1][0][0] if right_payload else heads[1][0]
+                i = 0 if start0 <= start1 else 1
+            items, has_payload, opened = sides[i]
+            item = heads[i]
+            heads[i] = next(items, None)
+            start, end = item[0] if has_payload else item
+            others = sides[1 - i][2]
+            while others and others[0][0] < start:
+                heappop(others)
+            for _, _, other in others:
+                yield (item, other) if i == 0 else (other, item)
+            heappush(opened, (end, seq, item))
+            seq += 1
+
     def getDepth(self):
         """
         Get the max depth of the BST
@@ -210,67 +755,86 @@ class IntervalTree:
             node = node.right
         return node 
 
-    def insert(self, val):
+    def insert(self, val, payload = None):
         """
         insert a val into IntervalTree
+        in payload mode payload goes into the bucket of the node of val.
         """
-        assert len(val) == 2
-        assert val[1] >= val[0]
-        val = tuple(val)
+        val = self._checkInterval(val)
+        if self._ends is not None:
+            self._ends.insert((val[1], val[0]))
+        if self._cover is not None:
+            self._addCover(val, 1)
+        self.nodes_count += 1
+        if self.multiset:
+            node = self._dfsSearch(self.root, val)
+            if node is not None:
+                node.count += 1
+                if self.withPayload:
+                    node.payloads.append(payload)
+                while node:
+                    node.size += 1
+                    node = node.parent
+                return
         if self.root is None:
             self.setRoot(val)
+            node = self.root
         else:
-            self._insertNode(self.root, val)
-        self.nodes_count += 1
+            node = self._insertNode(self.root, val)
+        if self.withPayload:
+            node.payloads = [payload]
     
     def _insertNode(self, currentNode, val):
         """
         Helper function to insert a value into IntervalTree.
+        walk down from currentNode in a loop, updating the augmentations on the way. equal intervals go right.
+        return the new IntervalNode.
         """
-        # first, update the currentNode
-        currentNode.maxRight = max(currentNode.maxRight, val[1])
-
-        node_to_rebalance = None
-        if currentNode.val > val:
-            if(currentNode.left):
-                self._insertNode(currentNode.left, val)
-            else:
-                child_node = IntervalNode(val)
-                currentNode.left = child_node
-                child_node.parent = currentNode
-                if currentNode.height == 0:
-                    self._recomputeHeights(currentNode)
-                    node = currentNode
-                    while node:
-                        if node.balanceFactor() in [-2 , 2]:
-                            node_to_rebalance = node
-                            break #we need the one that is furthest from the root
-                        node = node.parent
-        else:
-            if(currentNode.right):
-                self._insertNode(currentNode.right, val)
+        end = val[1]
+        while True:
+            if currentNode.maxRight < end:
+                currentNode.maxRight = end
+            currentNode.size += 1
+            if currentNode.val > val:
+                if currentNode.left is None:
+                    child_node = IntervalNode(val)
+                    currentNode.left = child_node
+                    break
+                currentNode = currentNode.left
             else:
-                child_node = IntervalNode(val)
-                currentNode.right = child_node
-                child_node.parent = currentNode
-                if currentNode.height == 0:
-                    self._recomputeHeights(currentNode)
-                    node = currentNode
-                    while node:
-                        if node.balanceFactor() in [-2 , 2]:
-                            node_to_rebalance = node
-                            break #we need the one that is furthest from the root
-                        node = node.parent
-        if node_to_rebalance:
-            self._rebalance(node_to_rebalance)
+                if currentNode.right is None:
+                    child_node = IntervalNode(val)
+                    currentNode.right = child_node
+                    break
+                currentNode = currentNode.right
+        child_node.parent = currentNode
+        if currentNode.height == 0:
+            self._recomputeHeights(currentNode)
+            node = currentNode
+            while node:
+                if node.balanceFactor() in [-2 , 2]:
+                    self._rebalance(node) #we need the one that is furthest from the root
+                    break
+                node = node.parent
+        return child_node
     
     def _recomputeMaxRight(self, node):
         """
-        update the maxRight of an IntervalNode.
+        update the maxRight (and size) of an IntervalNode from its children.
         """
-        max1 = -float("inf") if not node.left else node.left.maxRight
-        max2 = -float("inf") if not node.right else node.right.maxRight
-        node.maxRight = max(node.val[1], max1, max2)
+        maxRight = node.val[1]
+        size = node.count
+        left, right = node.left, node.right
+        if left is not None:
+            if left.maxRight > maxRight:
+                maxRight = left.maxRight
+            size += left.size
+        if right is not None:
+            if right.maxRight > maxRight:
+                maxRight = right.maxRight
+            size += right.size
+        node.maxRight = maxRight
+        node.size = size
 
     def _rebalance(self, node_to_rebalance):
         """
@@ -467,36 +1031,80 @@ class IntervalTree:
         Search a IntervalNode satisfies IntervalNode.val = key.
         if found return IntervalNode, else return None.
         """
-        assert len(key) == 2
-        assert key[1] >= key[0]
-        key = tuple(key)
+        key = self._checkInterval(key)
         return self._dfsSearch(self.root, key)
     
     def _dfsSearch(self, currentNode, key):
         """
         Helper function to search a key in IntervalTree.
         """
-        if currentNode is None:
-            return None
-        elif currentNode.val == key:
-            return currentNode
-        elif currentNode.val > key:
-            return self._dfsSearch(currentNode.left, key)
-        else:
-            return self._dfsSearch(currentNode.right, key)
+        node = currentNode
+        while node is not None:
+            if node.val == key:
+                return node
+            node = node.left if node.val > key else node.right
+        return None
     
-    def delete(self, key):
+    def count(self, key):
+        """
+        return the number of copies of the interval key.
+        """
+        key = self._checkInterval(key)
+        res = 0
+        stack = []
+        node = self.root
+        while node:
+            if node.val < key:
+                node = node.right
+            else:
+                stack.append(node)
+                node = node.left
+        while stack:
+            node = stack.pop()
+            if node.val != key:
+                break
+            res += node.count
+            node = node.right
+            while node:
+                stack.append(node)
+                node = node.left
+        return res
+
+    def delete(self, key, payload = _ANY):
         """
         Delete a key from IntervalTree
+        in payload mode delete the copy carrying payload, or the last copy if no payload is given.
+        nothing happens if key (with payload) is not found.
         """
-        assert len(key) == 2
-        assert key[1] >= key[0]
-        key = tuple(key)
+        key = self._checkInterval(key)
 
         # first find
-        node = self.search(key)
+        node = self._dfsSearch(self.root, key)
+        if node is None:
+            return
+        if node.payloads is not None:
+            if payload is _ANY:
+                node.payloads.pop()
+            else:
+                for i, p in enumerate(node.payloads):
+                    if p == payload:
+                        del node.payloads[i]
+                        break
+                else:
+                    return
+        if self._ends is not None:
+            self._ends.delete((key[1], key[0]))
+        if self._cover is not None:
+            self._addCover(key, -1)
         
-        if not node is None:
+        if node.count > 1:
+            # multiset mode, drop one copy
+            node.count -= 1
+            self.nodes_count -= 1
+            while node:
+                node.size -= 1
+                node = node.parent
+        else:
             self.nodes_count -= 1
             #     There are three cases:
             # 
@@ -529,13 +1137,11 @@ class IntervalTree:
             self.root = None
         del node
 
-        # recomputeMaxRight due to the deletion
-        changed = True
+        # recomputeMaxRight due to the deletion, all the way up: after _swapNodes
+        # an unchanged node can still have an ancestor holding the removed maxRight
         node = parent
-        while node and changed:
-            old_maxRight = node.maxRight
+        while node:
             self._recomputeMaxRight(node)
-            changed = (node.maxRight != old_maxRight)
             node = node.parent
 
         # rebalance
@@ -559,15 +1165,16 @@ class IntervalTree:
                 assert (node.right)
                 node.right.parent = parent 
             self._recomputeHeights(parent)
+        else:
+            self.root = node.right if node.right else node.left
+            self.root.parent = None
         del node
 
-        # recomputeMaxRight due to the deletion
-        changed = True
+        # recomputeMaxRight due to the deletion, all the way up: after _swapNodes
+        # an unchanged node can still have an ancestor holding the removed maxRight
         node = parent
-        while node and changed:
-            old_maxRight = node.maxRight
+        while node:
             self._recomputeMaxRight(node)
-            changed = (node.maxRight != old_maxRight)
             node = node.parent
 
         # rebalance
@@ -644,7 +1251,7 @@ class IntervalTree:
             if not node:
                 return
             _dfs_in_order(node.left,res)
-            res.append(node.val)
+            res.extend([node.val] * node.count)
             _dfs_in_order(node.right,res)
         _dfs_in_order(self.root, res)
         return res
@@ -654,7 +1261,7 @@ class IntervalTree:
         def _dfs_pre_order(node, res):
             if not node:
                 return
-            res.append(node.val)
+            res.extend([node.val] * node.count)
             _dfs_pre_order(node.left,res)
             _dfs_pre_order(node.right,res)
         _dfs_pre_order(self.root, res)
@@ -667,22 +1274,31 @@ class IntervalTree:
                 return
             _dfs_post_order(node.left,res)
             _dfs_post_order(node.right,res)
-            res.append(node.val)
+            res.extend([node.val] * node.count)
         _dfs_post_order(self.root, res)
         return res
     
     @classmethod
-    def buildFromList(cls, l, shuffle = True):
+    def buildFromList(cls, l, shuffle = True, multiset = False, withPayload = False, trackEnds = False, trackCoverage = False):
         """
         return a IntervalTree object from l.
         suffle the list first for better balance.
+        in payload mode l holds (interval, payload) pairs.
+        the coverage index is built once at the end, from the sorted deltas.
         """
         if shuffle:
             random.seed()
             random.shuffle(l)
-        IT = IntervalTree()
-        for item in l:
-            IT.insert(item)
+        IT = cls(multiset = multiset, withPayload = withPayload, trackEnds = trackEnds)
+        if withPayload:
+            for item, payload in l:
+                IT.insert(item, payload)
+        else:
+            for item in l:
+                IT.insert(item)
+        if trackCoverage:
+            IT.trackCoverage = True
+            IT._cover = IT._buildCoverIndex()
         return IT
     
     def visulize(self):
@@ -717,6 +1333,19 @@ class IntervalTree:
                 layer_count -= 1
             print("-----------------End Visualization-------------------")
 
+# tree of the worker process, set once by the pool initializer of queryAllOverlapsParallel
+_workerTree = None
+
+
+def _initQueryWorker(tree):
+    global _workerTree
+    _workerTree = tree
+
+
+def _queryChunk(queries):
+    return _workerTree.queryAllOverlapsBatch(queries)
+
+
 if __name__ == "__main__":
     print("[BEGIN]Test Implementation of IntervalTree.")
     # Simple Insert Test
@@ -762,4 +1391,11 @@ if __name__ == "__main__":
     print("Overlap with [0,3]",overlaps.queryOverlap([0,3]))
     # Test findAllOverlaps
     print("queryAllOverlaps with [10,20]",overlaps.queryAllOverlaps([10,20]))
+    tracked = IntervalTree.buildFromList(intervals + [[24,24]], trackEnds = True, trackCoverage = True)
+    tracked.delete([15,18])
+    print("countOverlaps with [10,20]",tracked.countOverlaps([10,20]),"countStab 8",tracked.countStab(8))
+    print("nearestLeft of [12,13]",tracked.nearestLeft([12,13]),"nearestRight",overlaps.nearestRight([12,13]))
+    print("gaps in [0,30]",overlaps.gaps(0,30),"with the coverage index",tracked.gaps(0,30))
+    print("coveredIntervals in [0,30]",tracked.coveredIntervals(0,30),"coveredLength",tracked.coveredLength(0,30))
+    print("queryAllOverlapsParallel",overlaps.queryAllOverlapsParallel([[10,20],[0,3],[22,30]], workers = 2, chunksize = 1))
     print("[END]Test Implementation of IntervalTree.")
\ No newline at end of file
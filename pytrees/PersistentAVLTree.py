@@ -0,0 +1,380 @@
+"""
+Persistent AVL Tree.
+
+Balanced Binary Search Tree with path copying. insert and delete never modify an existing node,
+they copy the O(logN) nodes on the search path and share everything else with the old version.
+Every old version stays valid, so a snapshot costs O(1) and readers of a snapshot never see a
+half-rotated tree while a writer keeps updating.
+
+Convention:
+
+- "key" and "val" are almost the same in this implementation. use term "key" for search and delete a particular node. use term "val" for other cases
+- nodes have no parent pointer, a node can be shared by many versions.
+
+API:
+
+- insert(self, val)
+- delete(self, key)
+- search(self, key)
+- snapshot(self)
+- getDepth(self)
+- preOrder(self)
+- inOrder(self)
+- postOrder(self)
+- countNodes(self)
+- buildFromList(cls, l)
+- irange(self, lo, hi, reverse)
+- __iter__(self)
+- __setitem__(self, key, value) / __getitem__(self, key) / get(self, key, default) / items(self)
+
+Reference: https://en.wikipedia.org/wiki/Persistent_data_structure#Path_copying
+"""
+
+from collections import deque
+from itertools import islice
+import operator
+
+
+class PersistentAVLNode:
+    __slots__ = ("val", "payload", "left", "right", "height", "size")
+
+    def __init__(self, val, left = None, right = None, payload = None):
+        self.val = val
+        self.payload = payload
+        self.left = left
+        self.right = right
+        self.height = max(left.height if left else -1, right.height if right else -1) + 1
+        self.size = (left.size if left else 0) + (right.size if right else 0) + 1
+
+    def isLeaf(self):
+        return (self.height == 0)
+
+    def balanceFactor(self):
+        return (self.left.height if self.left else -1) - (self.right.height if self.right else -1)
+
+    def __str__(self):
+        return "PersistentAVLNode("+ str(self.val)+ ", Height: %d )" % self.height
+
+
+class PersistentAVLTree:
+    def __init__(self):
+        self.root = None
+        self.rebalance_count = 0
+
+    @property
+    def nodes_count(self):
+        # read from the root, so swapping the root is the only store of an update
+        root = self.root
+        return root.size if root else 0
+
+    def countNodes(self):
+        return self.nodes_count
+
+    def __len__(self):
+        return self.nodes_count
+
+    def __contains__(self, key):
+        return self.search(key) is not None
+
+    def getDepth(self):
+        """
+        Get the max depth of the BST
+        """
+        if self.root:
+            return self.root.height
+        else:
+            return -1
+
+    def snapshot(self):
+        """
+        return a PersistentAVLTree sharing the current version. O(1)
+        later updates of either tree are not visible to the other one.
+        """
+        snap = PersistentAVLTree()
+        snap._setRoot(self.root)
+        return snap
+
+    def _setRoot(self, root):
+        # a single attribute store, readers see either the old or the new version, len() included
+        self.root = root
+
+    def insert(self, val):
+        """
+        insert a val into PersistentAVLTree, copying only the search path.
+        """
+        self._setRoot(self._insertNode(self.root, val, None))
+
+    def _insertNode(self, node, val, payload):
+        """
+        Helper function to insert a value into the subtree rooted at node.
+        return the root of the new version of the subtree. equal keys go right.
+        """
+        if node is None:
+            return PersistentAVLNode(val, payload = payload)
+        if node.val > val:
+            return self._balance(node.val, self._insertNode(node.left, val, payload), node.right, node.payload)
+        return self._balance(node.val, node.left, self._insertNode(node.right, val, payload), node.payload)
+
+    def _balance(self, val, left, right, payload):
+        """
+        return a new node for val over left and right, rotated if the heights differ by 2.
+        """
+        hl = left.height if left else -1
+        hr = right.height if right else -1
+        if hl > hr + 1:
+            self.rebalance_count += 1
+            if (left.left.height if left.left else -1) >= (left.right.height if left.right else -1):
+                # case LLC
+                return PersistentAVLNode(left.val, left.left, PersistentAVLNode(val, left.right, right, payload), left.payload)
+            # case LRC
+            C = left.right
+            return PersistentAVLNode(C.val,
+                                     PersistentAVLNode(left.val, left.left, C.left, left.payload),
+                                     PersistentAVLNode(val, C.right, right, payload),
+                                     C.payload)
+        if hr > hl + 1:
+            self.rebalance_count += 1
+            if (right.right.height if right.right else -1) >= (right.left.height if right.left else -1):
+                # case RRC
+                return PersistentAVLNode(right.val, PersistentAVLNode(val, left, right.left, payload), right.right, right.payload)
+            # case RLC
+            C = right.left
+            return PersistentAVLNode(C.val,
+                                     PersistentAVLNode(val, left, C.left, payload),
+                                     PersistentAVLNode(right.val, C.right, right.right, right.payload),
+                                     C.payload)
+        return PersistentAVLNode(val, left, right, payload)
+
+    def search(self, key):
+        """
+        Search a PersistentAVLNode satisfies PersistentAVLNode.val = key.
+        if found return PersistentAVLNode, else return None.
+        """
+        node = self.root
+        while node is not None:
+            if node.val == key:
+                return node
+            node = node.left if node.val > key else node.right
+        return None
+
+    def delete(self, key):
+        """
+        Delete a key from PersistentAVLTree, copying only the search path.
+        """
+        root = self._deleteNode(self.root, key)
+        if root is not self.root:
+            self._setRoot(root)
+
+    def _deleteNode(self, node, key):
+        """
+        Helper function to delete a key from the subtree rooted at node.
+        return the root of the new version of the subtree, or node itself if key is not found.
+        """
+        if node is None:
+            return None
+        if node.val == key:
+            if node.left is None:
+                return node.right
+            if node.right is None:
+                return node.left
+            successor = node.right
+            while successor.left:
+                successor = successor.left
+            return self._balance(successor.val, node.left, self._deleteSmallest(node.right), successor.payload)
+        if node.val > key:
+            left = self._deleteNode(node.left, key)
+            if left is node.left:
+                return node
+            return self._balance(node.val, left, node.right, node.payload)
+        right = self._deleteNode(node.right, key)
+        if right is node.right:
+            return node
+        return self._balance(node.val, node.left, right, node.payload)
+
+    def _deleteSmallest(self, node):
+        if node.left is None:
+            return node.right
+        return self._balance(node.val, self._deleteSmallest(node.left), node.right, node.payload)
+
+    def __getitem__(self, key):
+        """
+        return the payload stored under key, raise KeyError if not found.
+        """
+        node = self.search(key)
+        if node is None:
+            raise KeyError(key)
+        return node.payload
+
+    def __setitem__(self, key, value):
+        """
+        store value under key, replacing the payload if key is already in the PersistentAVLTree.
+        """
+        root = self._deleteNode(self.root, key)
+        self._setRoot(self._insertNode(root, key, value))
+
+    def get(self, key, default = None):
+        node = self.search(key)
+        return default if node is None else node.payload
+
+    def items(self):
+        """
+        Lazily iterate (key, payload) pairs in sorted order.
+        """
+        for node in self._iterNodes(None, None, False):
+            yield (node.val, node.payload)
+
+    def inOrder(self):
+        res = []
+        stack = []
+        node = self.root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            res.append(node.val)
+            node = node.right
+        return res
+
+    def preOrder(self):
+        res = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            res.append(node.val)
+            if node.right:
+                stack.append(node.right)
+            if node.left:
+                stack.append(node.left)
+        return res
+
+    def postOrder(self):
+        # node-right-left pre-order, reversed
+        res = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            res.append(node.val)
+            if node.left:
+                stack.append(node.left)
+            if node.right:
+                stack.append(node.right)
+        res.reverse()
+        return res
+
+    def __iter__(self):
+        return self.irange()
+
+    def irange(self, lo = None, hi = None, reverse = False):
+        """
+        Lazily iterate the vals in the closed range [lo, hi] in sorted order.
+        lo/hi of None means unbounded. The iteration reads the version current at the call.
+        """
+        for node in self._iterNodes(lo, hi, reverse):
+            yield node.val
+
+    def _iterNodes(self, lo, hi, reverse):
+        """
+        Helper generator for irange, in-order walk with an explicit stack.
+        """
+        stack = []
+        node = self.root
+        if not reverse:
+            while node:
+                if lo is not None and node.val < lo:
+                    node = node.right
+                else:
+                    stack.append(node)
+                    node = node.left
+            while stack:
+                node = stack.pop()
+                if hi is not None and node.val > hi:
+                    return
+                yield node
+                node = node.right
+                while node:
+                    stack.append(node)
+                    node = node.left
+        else:
+            while node:
+                if hi is not None and node.val > hi:
+                    node = node.left
+                else:
+                    stack.append(node)
+                    node = node.right
+            while stack:
+                node = stack.pop()
+                if lo is not None and node.val < lo:
+                    return
+                yield node
+                node = node.left
+                while node:
+                    stack.append(node)
+                    node = node.right
+
+    @classmethod
+    def buildFromList(cls, l):
+        """
+        return a PersistentAVLTree object from l, in O(n) for sorted input. l is not modified.
+        """
+        if not isinstance(l, list):
+            l = list(l)
+        if not all(map(operator.le, l, islice(l, 1, None))):
+            l = sorted(l)
+        T = cls()
+        T._setRoot(T._buildBalanced(l, 0, len(l) - 1))
+        return T
+
+    def _buildBalanced(self, vals, lo, hi):
+        if lo > hi:
+            return None
+        mid = (lo + hi) // 2
+        return PersistentAVLNode(vals[mid], self._buildBalanced(vals, lo, mid - 1), self._buildBalanced(vals, mid + 1, hi))
+
+    def visulize(self):
+        """
+        Naive Visulization.
+        Warn: Only for simple test usage.
+        """
+        if self.root is None:
+            print("EMPTY TREE.")
+        else:
+            print("-----------------Visualize Tree----------------------")
+            layer = deque([self.root])
+            layer_count = self.getDepth()
+            while len( list(filter(lambda x:x is not None, layer) )):
+                new_layer = deque([])
+                val_list = []
+                while len(layer):
+                    node = layer.popleft()
+                    if node is not None:
+                        val_list.append(node.val)
+                    else:
+                        val_list.append(" ")
+                    if node is None:
+                        new_layer.append(None)
+                        new_layer.append(None)
+                    else:
+                        new_layer.append(node.left)
+                        new_layer.append(node.right)
+                val_list = [" "] * layer_count + val_list
+                print(*val_list, sep="  ", end="\n")
+                layer = new_layer
+                layer_count -= 1
+            print("-----------------End Visualization-------------------")
+
+
+if __name__ == "__main__":
+    print("[BEGIN]Test Implementation of PersistentAVLTree.")
+    T = PersistentAVLTree.buildFromList(list(range(8)))
+    T.visulize()
+    snap = T.snapshot()
+    T.insert(8)
+    print("Left subtree shared with snapshot:", T.root.left is snap.root.left)
+    T.delete(0)
+    T.delete(3)
+    T.visulize()
+    snap.visulize()
+    print("Current:", T.inOrder())
+    print("Snapshot:", snap.inOrder())
+    print("[END]Test Implementation of PersistentAVLTree.")
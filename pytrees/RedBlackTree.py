@@ -0,0 +1,484 @@
+"""
+Red Black Tree.
+
+Balanced Binary Search Tree. Gurantee for balance with fewer rotations than AVLTree:
+insert does at most 2 rotations and delete at most 3, the rest of the fixup only recolors.
+Choose it over AVLTree when deletes are as frequent as inserts, compare rotation_count of both.
+
+Convention:
+
+- "key" and "val" are almost the same in this implementation. use term "key" for search and delete a particular node. use term "val" for other cases
+- equal vals are allowed, same as AVLTree. equal keys go right.
+
+API:
+
+- insert(self, val)
+- delete(self, key)
+- search(self, key)
+- getDepth(self)
+- preOrder(self)
+- inOrder(self)
+- postOrder(self)
+- countNodes(self)
+- buildFromList(cls, l)
+- irange(self, lo, hi, reverse)
+- __iter__(self)
+- min(self) / max(self)
+
+Reference: Cormen, Leiserson, Rivest, Stein. Introduction to Algorithms, chapter 13.
+Reference: https://en.wikipedia.org/wiki/Red%E2%80%93black_tree
+"""
+
+from collections import deque
+from itertools import islice
+import operator
+
+
+class RedBlackNode:
+    __slots__ = ("val", "parent", "left", "right", "red")
+
+    def __init__(self, val):
+        self.val = val
+        self.parent = None
+        self.left = None
+        self.right = None
+        self.red = True # new nodes are red, None children count as black
+
+    def isLeaf(self):
+        return (self.left is None and self.right is None)
+
+    def __str__(self):
+        return "RedBlackNode(" + str(self.val) + ", " + ("red" if self.red else "black") + ")"
+
+
+class RedBlackTree:
+    def __init__(self):
+        self.root = None
+        self.rebalance_count = 0 # fixup steps that rotate, a double rotation counts once
+        self.rotation_count = 0
+        self.nodes_count = 0
+
+    def countNodes(self):
+        return self.nodes_count
+
+    def __len__(self):
+        return self.nodes_count
+
+    def __contains__(self, key):
+        return self.search(key) is not None
+
+    def getDepth(self):
+        """
+        Get the max depth of the RedBlackTree, at most 2log(N + 1). O(N), nodes do not store heights.
+        """
+        depth = -1
+        stack = [(self.root, 0)] if self.root else []
+        while stack:
+            node, d = stack.pop()
+            if d > depth:
+                depth = d
+            if node.left:
+                stack.append((node.left, d + 1))
+            if node.right:
+                stack.append((node.right, d + 1))
+        return depth
+
+    def insert(self, val):
+        """
+        insert a val into RedBlackTree. O(logN), at most 2 rotations.
+        """
+        node = RedBlackNode(val)
+        parent = None
+        current = self.root
+        while current is not None:
+            parent = current
+            current = current.left if current.val > val else current.right
+        node.parent = parent
+        if parent is None:
+            self.root = node
+        elif parent.val > val:
+            parent.left = node
+        else:
+            parent.right = node
+        self.nodes_count += 1
+        self._insertFixup(node)
+
+    def _insertFixup(self, node):
+        """
+        Restore the red black properties after node was linked in red.
+        """
+        while node.parent is not None and node.parent.red:
+            parent = node.parent
+            grand = parent.parent # parent is red, so it is not the root
+            if parent is grand.left:
+                uncle = grand.right
+                if uncle is not None and uncle.red:
+                    # case 1, recolor and move up
+                    parent.red = uncle.red = False
+                    grand.red = True
+                    node = grand
+                    continue
+                if node is parent.right:
+                    # case 2, turn into case 3
+                    node = parent
+                    self._rotateLeft(node)
+                    parent = node.parent
+                # case 3
+                parent.red = False
+                grand.red = True
+                self._rotateRight(grand)
+                self.rebalance_count += 1
+            else:
+                uncle = grand.left
+                if uncle is not None and uncle.red:
+                    parent.red = uncle.red = False
+                    grand.red = True
+                    node = grand
+                    continue
+                if node is parent.left:
+                    node = parent
+                    self._rotateRight(node)
+                    parent = node.parent
+                parent.red = False
+                grand.red = True
+                self._rotateLeft(grand)
+                self.rebalance_count += 1
+        self.root.red = False
+
+    def _rotateLeft(self, node):
+        """
+        [Original]:          [After Rotation]:
+              node                pivot
+             /    \\               /    \\
+            A    pivot         node    C
+                /    \\        /    \\
+               B      C      A      B
+        """
+        pivot = node.right
+        node.right = pivot.left
+        if pivot.left is not None:
+            pivot.left.parent = node
+        self._transplant(node, pivot)
+        pivot.left = node
+        node.parent = pivot
+        self.rotation_count += 1
+
+    def _rotateRight(self, node):
+        pivot = node.left
+        node.left = pivot.right
+        if pivot.right is not None:
+            pivot.right.parent = node
+        self._transplant(node, pivot)
+        pivot.right = node
+        node.parent = pivot
+        self.rotation_count += 1
+
+    def _transplant(self, old, new):
+        """
+        Put new where old hangs from its parent, new may be None.
+        """
+        parent = old.parent
+        if parent is None:
+            self.root = new
+        elif old is parent.left:
+            parent.left = new
+        else:
+            parent.right = new
+        if new is not None:
+            new.parent = parent
+
+    def search(self, key):
+        """
+        Search a RedBlackNode satisfies RedBlackNode.val = key.
+        if found return RedBlackNode, else return None.
+        """
+        node = self.root
+        while node is not None:
+            if node.val == key:
+                return node
+            node = node.left if node.val > key else node.right
+        return None
+
+    def delete(self, key):
+        """
+        Delete a key from RedBlackTree. O(logN), at most 3 rotations.
+        """
+        node = self.search(key)
+        if node is not None:
+            self._deleteNode(node)
+
+    def _deleteNode(self, node):
+        """
+        Unlink node and restore the red black properties.
+        """
+        self.nodes_count -= 1
+        removed_red = node.red
+        if node.left is None:
+            child, parent = node.right, node.parent
+            self._transplant(node, node.right)
+        elif node.right is None:
+            child, parent = node.left, node.parent
+            self._transplant(node, node.left)
+        else:
+            # move the successor into the place of node, it takes over the color of node
+            successor = node.right
+            while successor.left is not None:
+                successor = successor.left
+            removed_red = successor.red
+            child = successor.right
+            if successor.parent is node:
+                parent = successor
+            else:
+                parent = successor.parent
+                self._transplant(successor, successor.right)
+                successor.right = node.right
+                successor.right.parent = successor
+            self._transplant(node, successor)
+            successor.left = node.left
+            successor.left.parent = successor
+            successor.red = node.red
+        if not removed_red:
+            self._deleteFixup(child, parent)
+
+    def _deleteFixup(self, node, parent):
+        """
+        node (maybe None) under parent carries an extra black, push it up or end it with rotations.
+        """
+        while node is not self.root and (node is None or not node.red):
+            if node is parent.left:
+                sibling = parent.right # not None, its side has a bigger black height
+                if sibling.red:
+                    # case 1, make the sibling black
+                    sibling.red = False
+                    parent.red = True
+                    self._rotateLeft(parent)
+                    self.rebalance_count += 1
+                    sibling = parent.right
+                if (sibling.left is None or not sibling.left.red) and (sibling.right is None or not sibling.right.red):
+                    # case 2, recolor and move up
+                    sibling.red = True
+                    node = parent
+                    parent = node.parent
+                    continue
+                if sibling.right is None or not sibling.right.red:
+                    # case 3, turn into case 4
+                    sibling.left.red = False
+                    sibling.red = True
+                    self._rotateRight(sibling)
+                    sibling = parent.right
+                # case 4
+                sibling.red = parent.red
+                parent.red = False
+                sibling.right.red = False
+                self._rotateLeft(parent)
+                self.rebalance_count += 1
+                node = self.root
+            else:
+                sibling = parent.left
+                if sibling.red:
+                    sibling.red = False
+                    parent.red = True
+                    self._rotateRight(parent)
+                    self.rebalance_count += 1
+                    sibling = parent.left
+                if (sibling.left is None or not sibling.left.red) and (sibling.right is None or not sibling.right.red):
+                    sibling.red = True
+                    node = parent
+                    parent = node.parent
+                    continue
+                if sibling.left is None or not sibling.left.red:
+                    sibling.right.red = False
+                    sibling.red = True
+                    self._rotateLeft(sibling)
+                    sibling = parent.left
+                sibling.red = parent.red
+                parent.red = False
+                sibling.left.red = False
+                self._rotateRight(parent)
+                self.rebalance_count += 1
+                node = self.root
+        if node is not None:
+            node.red = False
+
+    def min(self):
+        """
+        return the smallest val, None if the RedBlackTree is empty.
+        """
+        if self.root is None:
+            return None
+        node = self.root
+        while node.left:
+            node = node.left
+        return node.val
+
+    def max(self):
+        """
+        return the biggest val, None if the RedBlackTree is empty.
+        """
+        if self.root is None:
+            return None
+        node = self.root
+        while node.right:
+            node = node.right
+        return node.val
+
+    def inOrder(self):
+        return [node.val for node in self._iterNodes(None, None, False)]
+
+    def preOrder(self):
+        res = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            res.append(node.val)
+            if node.right:
+                stack.append(node.right)
+            if node.left:
+                stack.append(node.left)
+        return res
+
+    def postOrder(self):
+        # node-right-left pre-order, reversed
+        res = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            res.append(node.val)
+            if node.left:
+                stack.append(node.left)
+            if node.right:
+                stack.append(node.right)
+        res.reverse()
+        return res
+
+    def __iter__(self):
+        return self.irange()
+
+    def irange(self, lo = None, hi = None, reverse = False):
+        """
+        Lazily iterate the vals in the closed range [lo, hi] in sorted order.
+        lo/hi of None means unbounded. The RedBlackTree must not be modified during the iteration.
+        """
+        for node in self._iterNodes(lo, hi, reverse):
+            yield node.val
+
+    def _iterNodes(self, lo, hi, reverse):
+        """
+        Helper generator for irange, in-order walk with an explicit stack.
+        """
+        stack = []
+        node = self.root
+        if not reverse:
+            while node:
+                if lo is not None and node.val < lo:
+                    node = node.right
+                else:
+                    stack.append(node)
+                    node = node.left
+            while stack:
+                node = stack.pop()
+                if hi is not None and node.val > hi:
+                    return
+                yield node
+                node = node.right
+                while node:
+                    stack.append(node)
+                    node = node.left
+        else:
+            while node:
+                if hi is not None and node.val > hi:
+                    node = node.left
+                else:
+                    stack.append(node)
+                    node = node.right
+            while stack:
+                node = stack.pop()
+                if lo is not None and node.val < lo:
+                    return
+                yield node
+                node = node.left
+                while node:
+                    stack.append(node)
+                    node = node.right
+
+    @classmethod
+    def buildFromList(cls, l, shuffle = True):
+        """
+        return a RedBlackTree object from l, in O(n) for sorted input. l is not modified.
+        the tree is perfectly balanced, only the nodes of the deepest level are red.
+        shuffle is ignored, kept for the same signature as AVLTree.buildFromList.
+        """
+        if not isinstance(l, list):
+            l = list(l)
+        if not all(map(operator.le, l, islice(l, 1, None))):
+            l = sorted(l)
+        T = cls()
+        # every None link of a perfectly balanced tree is at the last two levels
+        red_depth = len(l).bit_length() - 1
+        T.root = T._buildBalanced(l, 0, len(l) - 1, None, 0, red_depth)
+        T.nodes_count = len(l)
+        return T
+
+    def _buildBalanced(self, vals, lo, hi, parent, depth, red_depth):
+        if lo > hi:
+            return None
+        mid = (lo + hi) // 2
+        node = RedBlackNode(vals[mid])
+        node.parent = parent
+        node.red = (depth == red_depth and depth > 0)
+        node.left = self._buildBalanced(vals, lo, mid - 1, node, depth + 1, red_depth)
+        node.right = self._buildBalanced(vals, mid + 1, hi, node, depth + 1, red_depth)
+        return node
+
+    def visulize(self):
+        """
+        Naive Visulization, red nodes are marked with *.
+        Warn: Only for simple test usage.
+        """
+        if self.root is None:
+            print("EMPTY TREE.")
+        else:
+            print("-----------------Visualize Tree----------------------")
+            layer = deque([self.root])
+            layer_count = self.getDepth()
+            while len( list(filter(lambda x:x is not None, layer) )):
+                new_layer = deque([])
+                val_list = []
+                while len(layer):
+                    node = layer.popleft()
+                    if node is not None:
+                        val_list.append(str(node.val) + ("*" if node.red else ""))
+                    else:
+                        val_list.append(" ")
+                    if node is None:
+                        new_layer.append(None)
+                        new_layer.append(None)
+                    else:
+                        new_layer.append(node.left)
+                        new_layer.append(node.right)
+                val_list = [" "] * layer_count + val_list
+                print(*val_list, sep="  ", end="\n")
+                layer = new_layer
+                layer_count -= 1
+            print("-----------------End Visualization-------------------")
+
+
+if __name__ == "__main__":
+    print("[BEGIN]Test Implementation of RedBlackTree.")
+    RB = RedBlackTree()
+    for i in range(10):
+        RB.insert(i)
+    RB.visulize()
+    print("Total nodes: ", RB.countNodes())
+    print("Total rebalance: ", RB.rebalance_count, "Total rotations: ", RB.rotation_count)
+    for i in [3, 0, 7, 5]:
+        RB.delete(i)
+    RB.visulize()
+    print("Total rebalance: ", RB.rebalance_count, "Total rotations: ", RB.rotation_count)
+    print("----------------------------------------")
+    input_list = list(range(2**16))
+    new_RB = RedBlackTree.buildFromList(input_list)
+    print("Total Nodes:", new_RB.countNodes())
+    print("Total Depth:", new_RB.getDepth())
+    print("Test inOrder:", new_RB.inOrder() == input_list)
+    print("[END]Test Implementation of RedBlackTree.")
@@ -0,0 +1,320 @@
+"""
+Static Interval Index
+
+Frozen index for overlap queries on intervals that are loaded once and never updated.
+The intervals are kept in numpy arrays sorted by start, next to a running max of the ends
+and an implicit-tree max of the ends. A query [L, R] starts with two numpy.searchsorted calls:
+
+- the hits start at or before R, so they are before hi = searchsorted(starts, R, "right").
+- the running max of the ends is sorted, every interval before lo = searchsorted(maxEnds, L, "left") ends before L.
+- the hits are the intervals in [lo, hi) whose end is at least L.
+
+Up to DIRECT_CANDIDATES candidates in [lo, hi) are checked with one vectorized mask. More candidates mean
+a long interval early in the order holds the running max up, one chromosome-length feature would make
+every query O(N). Those queries walk the implicit tree instead: the sorted array is read as a perfectly
+balanced binary tree, the node at position i of level k (its k lowest bits set, bit k clear) has its children
+at i - 2^(k-1) and i + 2^(k-1), and treeMaxEnds[i] is the max end of its subtree. Subtrees ending before L
+or starting beyond R are skipped, subtrees of less than 2^(TREE_LEAF_LEVEL+1) intervals are masked at once,
+O(logN + hits). The layout is the one of cgranges.
+
+Convention:
+
+- intervals are closed [L, R] pairs with L <= R, same as IntervalTree.
+- hits are returned as int64 arrays of indices into the input intervals, ordered by (start, input index).
+- requires numpy.
+
+File format, written by save and mapped by load, little endian:
+
+- 24 bytes header: the magic b"PYTRSII2", the numpy dtype of the bounds as 8 ascii bytes ("<i8" or "<f8"), n as uint64.
+- order as n int64, then starts, ends, maxEnds and treeMaxEnds as n values of the bounds dtype each.
+
+load maps the file read-only, the arrays are views on the mapping: opening costs no parsing or copying,
+pages are read on demand and shared by every process mapping the same file.
+
+API:
+
+- queryOverlap(self, val)  --> index of one interval overlapping val, None if not found
+- queryAllOverlaps(self, val)  --> indices of the intervals overlapping val
+- queryAllOverlapsBatch(self, queries)  --> (query indices, interval indices) of every overlapping pair
+- fromIntervalTree(cls, tree)  --> index over tree.inOrder()
+- intervals(self)  --> the indexed intervals as an (n, 2) array, in input order
+- save(self, path)  --> write the index to path
+- load(cls, path)  --> index over the memory-mapped file written by save
+- __len__(self)
+
+Reference: https://numpy.org/doc/stable/reference/generated/numpy.searchsorted.html
+Reference: https://github.com/lh3/cgranges
+"""
+
+import mmap
+import os
+import struct
+
+try:
+    import numpy as np
+except ImportError: # numpy is optional for the rest of pytrees
+    np = None
+
+
+class StaticIntervalIndex:
+    # candidates materialized at once by queryAllOverlapsBatch
+    BATCH_CANDIDATES = 1 << 22
+    # above this many candidates a query walks the implicit tree instead of masking them all
+    DIRECT_CANDIDATES = 1 << 12
+    # subtrees at or below this level are masked at once
+    TREE_LEAF_LEVEL = 8
+    MAGIC = b"PYTRSII2"
+    HEADER = struct.Struct("<8s8sQ")
+
+    def __init__(self, intervals):
+        """
+        intervals: (n, 2) array-like of [start, end] pairs, never modified.
+        """
+        if np is None:
+            raise ImportError("StaticIntervalIndex requires numpy")
+        intervals = np.asarray(intervals)
+        if intervals.size == 0:
+            intervals = intervals.reshape(0, 2)
+        assert intervals.ndim == 2 and intervals.shape[1] == 2, "intervals should be an (n, 2) array"
+        assert np.all(intervals[:, 0] <= intervals[:, 1]), "every interval [L, R] should satisfy L <= R"
+        self.order = np.argsort(intervals[:, 0], kind = "stable")
+        self.starts = intervals[self.order, 0]
+        self.ends = intervals[self.order, 1]
+        self.maxEnds = np.maximum.accumulate(self.ends) if len(self.ends) else self.ends.copy()
+        self.treeMaxEnds = self._buildTreeMaxEnds(self.ends)
+
+    @staticmethod
+    def _buildTreeMaxEnds(ends):
+        """
+        return the max end of the implicit subtree of every position, one vectorized pass per level.
+        positions beyond n complete the tree while building, they hold the lowest value of the dtype.
+        """
+        n = len(ends)
+        if not n:
+            return ends.copy()
+        levels = n.bit_length() - 1
+        size = (1 << (levels + 1)) - 1
+        low = np.iinfo(ends.dtype).min if ends.dtype.kind in "iu" else -np.inf
+        res = np.full(size, low, dtype = ends.dtype)
+        res[:n] = ends
+        for k in range(1, levels + 1):
+            half = 1 << (k - 1)
+            step = 1 << (k + 1)
+            first = (1 << k) - 1
+            nodes = res[first::step]
+            m = len(nodes)
+            np.maximum(nodes, res[first - half::step][:m], out = nodes)
+            np.maximum(nodes, res[first + half::step][:m], out = nodes)
+        return res[:n].copy()
+
+    @classmethod
+    def fromIntervalTree(cls, tree):
+        """
+        return a StaticIntervalIndex over tree.inOrder(), hit indices refer to positions in tree.inOrder().
+        """
+        return cls(tree.inOrder())
+
+    def save(self, path):
+        """
+        write the index to path, in the format load maps.
+        integer bounds are written as int64, unsigned ones above its max raise ValueError.
+        """
+        kind = self.starts.dtype.kind
+        # every bound is at most the last running max of the ends
+        if kind == "u" and len(self.starts) and int(self.maxEnds[-1]) > np.iinfo(np.int64).max:
+            raise ValueError("unsigned bounds above the int64 max can not be saved")
+        dtype = np.dtype(np.int64) if kind in "iub" else np.dtype(np.float64)
+        dtype = dtype.newbyteorder("<")
+        with open(path, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, dtype.str.encode("ascii"), len(self.starts)))
+            f.write(np.ascontiguousarray(self.order, dtype = "<i8").tobytes())
+            for arr in (self.starts, self.ends, self.maxEnds, self.treeMaxEnds):
+                f.write(np.ascontiguousarray(arr, dtype = dtype).tobytes())
+
+    @classmethod
+    def load(cls, path):
+        """
+        return the index saved at path, its arrays are read-only views on a mapping of the file. O(1)
+        """
+        if np is None:
+            raise ImportError("StaticIntervalIndex requires numpy")
+        with open(path, "rb") as f:
+            size = cls.HEADER.size
+            magic, dtype, n = cls.HEADER.unpack(f.read(size))
+            assert magic == cls.MAGIC, "not a StaticIntervalIndex file"
+            dtype = np.dtype(dtype.rstrip(b"\0").decode("ascii"))
+            assert os.fstat(f.fileno()).st_size == size + n * (8 + 4 * dtype.itemsize), "truncated StaticIntervalIndex file"
+            # the mapping outlives the file object, the arrays keep it open
+            buf = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        res = cls.__new__(cls)
+        res.order = np.frombuffer(buf, dtype = "<i8", count = n, offset = size)
+        offset = size + 8 * n
+        arrays = []
+        for _ in range(4):
+            arrays.append(np.frombuffer(buf, dtype = dtype, count = n, offset = offset))
+            offset += dtype.itemsize * n
+        res.starts, res.ends, res.maxEnds, res.treeMaxEnds = arrays
+        return res
+
+    def __len__(self):
+        return len(self.starts)
+
+    def intervals(self):
+        """
+        return the indexed intervals as an (n, 2) array, in input order.
+        """
+        res = np.empty((len(self.starts), 2), dtype = self.starts.dtype)
+        res[self.order, 0] = self.starts
+        res[self.order, 1] = self.ends
+        return res
+
+    def queryOverlap(self, val):
+        """
+        return the index of one interval that overlaps with val, None if not found. O(logN)
+        """
+        assert len(val) == 2
+        assert val[1] >= val[0]
+        L, R = val
+        lo = np.searchsorted(self.maxEnds, L, "left")
+        # maxEnds jumps to L or more at lo, so the interval at lo is the one ending at or after L
+        if lo < len(self.starts) and self.starts[lo] <= R:
+            return int(self.order[lo])
+        return None
+
+    def queryAllOverlaps(self, val):
+        """
+        return the indices of the intervals that overlap with val, as an int64 array.
+        O(logN + candidates) up to DIRECT_CANDIDATES candidates, O(logN + hits) beyond.
+        """
+        assert len(val) == 2
+        assert val[1] >= val[0]
+        L, R = val
+        lo = np.searchsorted(self.maxEnds, L, "left")
+        hi = np.searchsorted(self.starts, R, "right")
+        if lo >= hi:
+            return np.empty(0, dtype = np.int64)
+        if hi - lo > self.DIRECT_CANDIDATES:
+            return self.order[self._treeHits(L, hi)].astype(np.int64, copy = False)
+        hits = np.flatnonzero(self.ends[lo:hi] >= L)
+        return self.order[lo + hits].astype(np.int64, copy = False)
+
+    def _treeHits(self, L, hi):
+        """
+        return the sorted positions before hi whose end is at least L, from a walk of the implicit tree.
+        """
+        tree = self.treeMaxEnds
+        ends = self.ends
+        # python scalars compare faster than numpy ones
+        tree_item, end_item = tree.item, ends.item
+        L = L.item() if hasattr(L, "item") else L
+        n = len(tree)
+        leaf_level = self.TREE_LEAF_LEVEL
+        level = n.bit_length() - 1
+        stack = [((1 << level) - 1, level)]
+        runs = []
+        # in-order, so the runs come out sorted, level -1 stands for the node alone
+        while stack:
+            i, k = stack.pop()
+            if k < 0:
+                if runs and runs[-1][1] == i:
+                    runs[-1][1] = i + 1
+                else:
+                    runs.append([i, i + 1])
+                continue
+            first = i - (1 << k) + 1
+            if first >= hi or (i < n and tree_item(i) < L):
+                continue
+            if k <= leaf_level:
+                last = min(i + (1 << k), hi, n)
+                if runs and runs[-1][1] == first:
+                    runs[-1][1] = last
+                else:
+                    runs.append([first, last])
+                continue
+            half = 1 << (k - 1)
+            if i >= n:
+                # past the end, the right subtree is empty
+                stack.append((i - half, k - 1))
+                continue
+            stack.append((i + half, k - 1))
+            if i < hi and end_item(i) >= L:
+                stack.append((i, -1))
+            stack.append((i - half, k - 1))
+        hits = [a + np.flatnonzero(ends[a:b] >= L) for a, b in runs]
+        if not hits:
+            return np.empty(0, dtype = np.int64)
+        return np.concatenate(hits)
+
+    def queryAllOverlapsBatch(self, queries):
+        """
+        queries: (q, 2) array-like of [L, R] pairs.
+        return (query_idx, interval_idx), two int64 arrays of the same length, one entry per overlapping pair,
+        grouped by query in input order.
+        queries with more than DIRECT_CANDIDATES candidates walk the implicit tree one by one.
+        """
+        queries = np.asarray(queries)
+        if queries.size == 0:
+            queries = queries.reshape(0, 2)
+        assert queries.ndim == 2 and queries.shape[1] == 2, "queries should be a (q, 2) array"
+        assert np.all(queries[:, 0] <= queries[:, 1]), "every query [L, R] should satisfy L <= R"
+        Ls = queries[:, 0]
+        los = np.searchsorted(self.maxEnds, Ls, "left")
+        his = np.searchsorted(self.starts, queries[:, 1], "right")
+        lens = np.maximum(his - los, 0)
+        wide = np.flatnonzero(lens > self.DIRECT_CANDIDATES)
+        lens[wide] = 0
+        bounds = np.cumsum(lens)
+        res_query = []
+        res_hit = []
+        # split the queries so a chunk materializes at most BATCH_CANDIDATES candidates
+        first = 0
+        while first < len(queries):
+            base = bounds[first - 1] if first else 0
+            last = max(int(np.searchsorted(bounds, base + self.BATCH_CANDIDATES, "right")), first + 1)
+            chunk_lens = lens[first:last]
+            total = int(chunk_lens.sum())
+            if total:
+                query_idx = np.repeat(np.arange(first, last, dtype = np.int64), chunk_lens)
+                # position of each candidate: lo of its query plus its rank inside the query
+                offsets = np.repeat(np.cumsum(chunk_lens) - chunk_lens - los[first:last], chunk_lens)
+                pos = np.arange(total, dtype = np.int64) - offsets
+                mask = self.ends[pos] >= Ls[query_idx]
+                res_query.append(query_idx[mask])
+                res_hit.append(self.order[pos[mask]].astype(np.int64, copy = False))
+            first = last
+        for q in wide.tolist():
+            pos = self._treeHits(Ls[q], his[q])
+            res_query.append(np.full(len(pos), q, dtype = np.int64))
+            res_hit.append(self.order[pos].astype(np.int64, copy = False))
+        if not res_query:
+            return np.empty(0, dtype = np.int64), np.empty(0, dtype = np.int64)
+        res_query = np.concatenate(res_query)
+        res_hit = np.concatenate(res_hit)
+        if len(wide):
+            # put the pairs of the wide queries back in query order, stable keeps the hits sorted
+            order = np.argsort(res_query, kind = "stable")
+            res_query, res_hit = res_query[order], res_hit[order]
+        return res_query, res_hit
+
+
+if __name__ == "__main__":
+    print("[BEGIN]Test Implementation of StaticIntervalIndex.")
+    intervals = [
+        [7,10],
+        [5,11],
+        [4,8],
+        [17,19],
+        [15,18],
+        [21,23]
+    ]
+    index = StaticIntervalIndex(intervals)
+    print("Overlap with [10,20]", index.queryAllOverlaps([10,20]))
+    print("Overlap with [24,25]", index.queryAllOverlaps([24,25]))
+    query_idx, interval_idx = index.queryAllOverlapsBatch([[10,20], [0,4], [22,30]])
+    print("Batch pairs", list(zip(query_idx.tolist(), interval_idx.tolist())))
+    import tempfile
+    path = os.path.join(tempfile.mkdtemp(), "intervals.sii")
+    index.save(path)
+    mapped = StaticIntervalIndex.load(path)
+    print("Mapped overlap with [10,20]", mapped.queryAllOverlaps([10,20]), "one of them", mapped.queryOverlap([10,20]))
+    print("[END]Test Implementation of StaticIntervalIndex.")
@@ -1,7 +1,11 @@
 from pytrees.AVLTree import AVLTree
 from pytrees.BinaryIndexTree import BinaryIndexTree
 from pytrees.BinarySearchTree import BinarySearchTree
+from pytrees.BTree import BTree
 from pytrees.IntervalTree import IntervalTree
+from pytrees.PersistentAVLTree import PersistentAVLTree
+from pytrees.RedBlackTree import RedBlackTree
+from pytrees.StaticIntervalIndex import StaticIntervalIndex
 from pytrees.Trie import Trie
 
 __version__ = "0.0.1"
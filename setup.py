@@ -143,6 +143,7 @@ if __name__ == "__main__":
         platforms=PLATFORMS,
         license=LICENSE,
         install_requires=REQUIRES,
+        extras_require={"numpy": ["numpy"]},
     )
 
 """